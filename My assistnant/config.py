@@ -6,6 +6,13 @@ load_dotenv()
 
 # LLM Configuration
 LLAMA_SERVER_URL = "http://localhost:8080/completion"
+# Every llama-server process to spread commands over; add one URL per process
+LLAMA_SERVER_URLS = [LLAMA_SERVER_URL]
+LLAMA_BACKEND_COOLDOWN = 30  # Seconds a failed llama-server is avoided before it is tried again
+LLAMA_CONNECT_TIMEOUT = 3  # Seconds to wait for a connection to llama-server
+LLAMA_READ_TIMEOUT = 60  # Seconds to wait for a completion before giving up
+LLAMA_POOL_SIZE = 4  # Keep-alive connections kept open to llama-server
+LLAMA_SLOT_ID = 0  # llama-server slot whose KV cache keeps the prompt prefix warm (-1 lets the server choose)
 
 # Wake word configuration
 WAKE_WORD = "jarvis"  # You can change this to any wake word supported by Porcupine
@@ -19,9 +26,45 @@ GOOGLE_SCOPES = [
     "https://www.googleapis.com/auth/calendar.events",
     "https://www.googleapis.com/auth/calendar.readonly",
     "https://www.googleapis.com/auth/gmail.readonly",
-    "https://www.googleapis.com/auth/gmail.send"
+    "https://www.googleapis.com/auth/gmail.send",
+    "https://www.googleapis.com/auth/gmail.modify"
 ]
 
+# Gmail configuration
+GMAIL_BATCH_SIZE = 50  # Requests per Gmail API batch (Google recommends at most 50)
+GMAIL_SYNC_INTERVAL = 60  # Seconds between incremental syncs with Gmail
+GMAIL_SYNC_DAYS = 30  # How far back the first full sync of the mailbox goes
+GMAIL_SYNC_MAX_MESSAGES = 500  # Upper bound on messages mirrored by a full sync
+GMAIL_MAX_BODY_CHARS = 10000  # Plain text stored per mirrored message
+OUTBOX_MAX_ATTEMPTS = 6  # Send attempts before a queued email is given up on
+OUTBOX_BASE_DELAY = 2  # Seconds before the first retry, doubled on each attempt
+OUTBOX_MAX_DELAY = 300  # Upper bound on the retry delay in seconds
+OUTBOX_DEDUPE_WINDOW = 600  # Seconds during which an identical email is not sent twice
+
+# Local cache configuration
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+CALENDAR_CACHE_PATH = os.path.join(CACHE_DIR, "calendar.db")
+GMAIL_CACHE_PATH = os.path.join(CACHE_DIR, "gmail.db")
+OUTBOX_PATH = os.path.join(CACHE_DIR, "outbox.db")
+NOTION_CACHE_PATH = os.path.join(CACHE_DIR, "notion.db")
+INTENT_CACHE_PATH = os.path.join(CACHE_DIR, "intents.db")
+INTENT_CACHE_SIZE = 256  # LLM results kept in memory
+INTENT_CACHE_TTL = 24 * 60 * 60  # Seconds a cached LLM result stays valid
+CALENDAR_SYNC_INTERVAL = 60  # Seconds between incremental syncs with Google Calendar
+CALENDAR_BATCH_SIZE = 50  # Requests per Calendar API batch (Google recommends at most 50)
+NOTION_SYNC_INTERVAL = 30  # Seconds between incremental syncs with Notion
+NOTION_FULL_REFRESH_INTERVAL = 6 * 60 * 60  # Seconds between full refreshes, which pick up deleted pages
+NOTION_RATE_LIMIT = 3  # Average Notion requests per second allowed per integration
+NOTION_BURST = 3  # Requests that may be sent back to back before throttling starts
+NOTION_MAX_RETRIES = 5  # Retries of a rate-limited Notion request
+NOTION_MAX_BACKOFF = 30  # Upper bound on the retry delay in seconds
+NOTION_BULK_WORKERS = 3  # Pages created concurrently by bulk task and note creation
+NOTION_SCHEMA_TTL = 60 * 60  # Seconds the Notion database schema is cached
+
+# Working hours used when searching for free time in the calendar
+WORKDAY_START_HOUR = 9
+WORKDAY_END_HOUR = 18
+
 # Notion API Configuration
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
@@ -44,6 +87,27 @@ COMMAND_PATTERNS = {
     "email": ["email", "mail", "gmail", "inbox", "unread"]
 }
 
+# Keywords scored by the intent matcher, with their weight per intent.
+# Commands whose best intent is weak or close to another go to the LLM.
+INTENT_KEYWORDS = {
+    "calendar": {
+        "calendar": 1.0, "googlecalendar": 1.0, "schedule": 1.0, "event": 1.0, "meeting": 1.0,
+        "appointment": 1.0, "free": 1.0, "busy": 1.0, "available": 1.0,
+        "today": 0.5, "tomorrow": 0.5, "week": 0.5, "month": 0.5
+    },
+    "email": {
+        "email": 1.0, "mail": 1.0, "gmail": 1.0, "inbox": 1.0, "unread": 1.0, "archive": 1.0,
+        "mark": 0.5, "read": 0.5
+    },
+    "notes": {"note": 1.0, "notion": 0.5},
+    "tasks": {"task": 1.0, "todo": 1.0, "to do": 1.0, "reminder": 1.0, "notion": 0.5}
+}
+INTENT_MIN_SCORE = 1.0  # Score the best intent needs to skip the LLM
+INTENT_MIN_MARGIN = 0.5  # Lead over the runner-up intent needed to skip the LLM
+INTENT_EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "intents.jsonl")  # Labelled example commands
+INTENT_MODEL_THRESHOLD = 0.5  # Similarity to the nearest example needed to skip the LLM
+INTENT_MODEL_MARGIN = 0.2  # Lead over the nearest example of another intent needed to skip the LLM
+
 def get_google_credentials():
     """Load Google API credentials from the credentials file."""
     if not os.path.exists(GOOGLE_CREDENTIALS_PATH):
@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+
+# Words that do not change what a command means
+FILLER_WORDS = {
+    'please', 'hey', 'hi', 'jarvis', 'um', 'uh', 'erm', 'okay', 'ok', 'so', 'just',
+    'kindly', 'can', 'could', 'would', 'you', 'me', 'for', 'the', 'a', 'an'
+}
+
+# Spoken variants of relative dates, mapped to one canonical form
+RELATIVE_DATES = {
+    'today': 'today', 'todays': 'today', 'tonight': 'today', 'tonights': 'today',
+    'tomorrow': 'tomorrow', 'tomorrows': 'tomorrow', 'tmrw': 'tomorrow',
+    'yesterday': 'yesterday', 'yesterdays': 'yesterday',
+    'monday': 'monday', 'tuesday': 'tuesday', 'wednesday': 'wednesday', 'thursday': 'thursday',
+    'friday': 'friday', 'saturday': 'saturday', 'sunday': 'sunday',
+    'week': 'week', 'weekend': 'weekend', 'month': 'month',
+}
+
+
+def normalize_utterance(text, today=None):
+    """
+    Reduce an utterance to a cache key: lower case, no punctuation or filler
+    words, and relative dates in one canonical form. Utterances with a
+    relative date also carry today's date, since "tomorrow" resolves
+    differently every day.
+
+    Args:
+        text (str): The user's command
+        today (date, optional): Date used for relative dates, defaults to today
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+    key_words = []
+    relative = False
+    for word in words:
+        if word in RELATIVE_DATES:
+            key_words.append(RELATIVE_DATES[word])
+            relative = True
+        elif word not in FILLER_WORDS:
+            key_words.append(word)
+    key = " ".join(key_words)
+    if relative:
+        key += f" @{(today or date.today()).isoformat()}"
+    return key
+
+
+class IntentCache:
+    def __init__(self, path=None, max_entries=256, ttl=86400):
+        """
+        LRU cache of structured LLM results keyed on normalized utterances,
+        backed by an optional SQLite file so entries survive restarts.
+
+        Args:
+            path (str, optional): Location of the SQLite database file
+            max_entries (int): Entries kept in memory
+            ttl (int): Seconds an entry stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS intents (key TEXT PRIMARY KEY, result TEXT, expires REAL)"
+                )
+                self.conn.execute("DELETE FROM intents WHERE expires < ?", (time.time(),))
+
+    def get(self, utterance):
+        """
+        Return the cached result for an utterance, or None on a miss.
+
+        Args:
+            utterance (str): The user's command
+        """
+        key = normalize_utterance(utterance)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT result, expires FROM intents WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, entry)
+            if entry is None or entry[1] < now:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Copied so callers cannot change the cached entry
+            return json.loads(json.dumps(entry[0]))
+
+    def put(self, utterance, result):
+        """
+        Cache the result for an utterance. Errors are never cached.
+
+        Args:
+            utterance (str): The user's command
+            result (dict): Structured action returned by the LLM
+        """
+        if result.get("intent") == "error":
+            return
+        key = normalize_utterance(utterance)
+        serialized = json.dumps(result)
+        # Keep a copy, so callers changing the result they were given cannot alter the cache
+        entry = (json.loads(serialized), time.time() + self.ttl)
+        with self._lock:
+            self._remember(key, entry)
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO intents (key, result, expires) VALUES (?, ?, ?)",
+                        (key, serialized, entry[1])
+                    )
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return hit and miss counters and the number of entries in memory."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def close(self):
+        """Close the SQLite connection."""
+        if self.conn is not None:
+            self.conn.close()
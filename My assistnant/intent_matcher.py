@@ -0,0 +1,68 @@
+import re
+from collections import defaultdict
+import config
+
+
+class IntentMatcher:
+    def __init__(self, keywords=None, min_score=None, min_margin=None):
+        """
+        Score every intent in one pass over a command.
+
+        All keywords are compiled into a single alternation regex with word
+        boundaries, so "email" does not count as "mail" and the cost does
+        not grow with the number of intents.
+
+        Args:
+            keywords (dict, optional): Intent name to {keyword: weight},
+                defaults to config.INTENT_KEYWORDS
+            min_score (float, optional): Score the best intent needs to be confident
+            min_margin (float, optional): Lead over the runner-up needed to be confident
+        """
+        keywords = keywords or config.INTENT_KEYWORDS
+        self.min_score = config.INTENT_MIN_SCORE if min_score is None else min_score
+        self.min_margin = config.INTENT_MIN_MARGIN if min_margin is None else min_margin
+
+        self._weights = defaultdict(list)
+        for intent, words in keywords.items():
+            for word, weight in words.items():
+                self._weights[word.lower()].append((intent, weight))
+
+        # Longest first, so multi-word keywords win over their prefixes
+        alternation = "|".join(
+            re.escape(word).replace(r"\ ", r"\s+")
+            for word in sorted(self._weights, key=len, reverse=True)
+        )
+        # An optional plural "s" saves listing every keyword twice
+        self._pattern = re.compile(rf"\b({alternation})s?\b", re.IGNORECASE)
+
+    def scores(self, text):
+        """
+        Return the score of every intent mentioned in the text, in order of
+        first mention. Each keyword counts once, however often it is repeated.
+
+        Args:
+            text (str): The user's command
+        """
+        # An ordered dict rather than a set, so ties are broken the same way on every run
+        found = dict.fromkeys(" ".join(match.group(1).lower().split()) for match in self._pattern.finditer(text))
+        scores = defaultdict(float)
+        for word in found:
+            for intent, weight in self._weights[word]:
+                scores[intent] += weight
+        return dict(scores)
+
+    def classify(self, text):
+        """
+        Return (intent, confident) for a command. The intent is None when no
+        keyword matched, and the first mentioned on a tie; confident is False
+        when the command is ambiguous and should be left to the LLM.
+
+        Args:
+            text (str): The user's command
+        """
+        ranked = sorted(self.scores(text).items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None, False
+        intent, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return intent, best >= self.min_score and best - runner_up >= self.min_margin
@@ -0,0 +1,135 @@
+import re
+import json
+import numpy as np
+
+
+def _ngrams(text, sizes=(2, 3, 4)):
+    """
+    Character n-grams of each word, padded with spaces so word starts and
+    ends are features of their own. Robust to plurals and misrecognized words.
+    """
+    grams = []
+    for word in re.findall(r"[a-z0-9']+", text.lower()):
+        padded = f" {word} "
+        for size in sizes:
+            grams.extend(padded[i:i + size] for i in range(max(1, len(padded) - size + 1)))
+    return grams
+
+
+class IntentModel:
+    def __init__(self, threshold=0.5, min_margin=0.0):
+        """
+        Nearest-neighbour intent classifier over TF-IDF character n-gram vectors.
+
+        Args:
+            threshold (float): Cosine similarity the nearest example needs
+                for the prediction to be trusted
+            min_margin (float): Lead the nearest example needs over the
+                nearest example of any other intent
+        """
+        self.threshold = threshold
+        self.min_margin = min_margin
+        self.vocabulary = {}
+        self.idf = None
+        self.vectors = None
+        self.labels = []
+
+    @classmethod
+    def from_jsonl(cls, path, threshold=0.5, min_margin=0.0):
+        """
+        Train a model from a JSONL file with one {"text": ..., "intent": ...} object per line.
+
+        Args:
+            path (str): Location of the examples file
+            threshold (float): Similarity needed to trust a prediction
+            min_margin (float): Lead needed over the best other intent
+        """
+        examples = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    example = json.loads(line)
+                    examples.append((example["text"], example["intent"]))
+        model = cls(threshold, min_margin)
+        model.train(examples)
+        return model
+
+    def train(self, examples):
+        """
+        Build the vocabulary, IDF weights and example vectors.
+
+        Args:
+            examples (list): (text, intent) pairs
+        """
+        documents = [_ngrams(text) for text, _ in examples]
+        self.labels = [intent for _, intent in examples]
+        self.vocabulary = {}
+        for grams in documents:
+            for gram in grams:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+
+        counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, grams in enumerate(documents):
+            for gram in grams:
+                counts[row, self.vocabulary[gram]] += 1
+
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.vectors = self._normalize(counts * self.idf)
+
+    def _normalize(self, matrix):
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _vectorize(self, text):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for gram in _ngrams(text):
+            index = self.vocabulary.get(gram)
+            if index is not None:
+                vector[index] += 1
+        return self._normalize(vector * self.idf)
+
+    def predict(self, text):
+        """
+        Return (intent, similarity) of the example closest to the text.
+
+        Args:
+            text (str): The user's command
+        """
+        if self.vectors is None or not self.labels:
+            return None, 0.0
+        similarities = self.vectors @ self._vectorize(text)
+        best = int(np.argmax(similarities))
+        return self.labels[best], float(similarities[best])
+
+    def scores(self, text):
+        """
+        Return the similarity of the closest example of every intent.
+
+        Args:
+            text (str): The user's command
+        """
+        if self.vectors is None or not self.labels:
+            return {}
+        similarities = self.vectors @ self._vectorize(text)
+        scores = {}
+        for label, similarity in zip(self.labels, similarities.tolist()):
+            scores[label] = max(scores.get(label, 0.0), similarity)
+        return scores
+
+    def classify(self, text):
+        """
+        Return the intent of the text, or None if no example is similar
+        enough or another intent comes too close.
+
+        Args:
+            text (str): The user's command
+        """
+        ranked = sorted(self.scores(text).items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None
+        intent, similarity = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if similarity < self.threshold or similarity - runner_up < self.min_margin:
+            return None
+        return intent
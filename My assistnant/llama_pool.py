@@ -0,0 +1,118 @@
+import time
+import threading
+from urllib.parse import urljoin
+
+
+class Backend:
+    def __init__(self, url):
+        """
+        State of one llama-server process.
+
+        Args:
+            url (str): Completion endpoint of the server
+        """
+        self.url = url
+        self.health_url = urljoin(url, "/health")
+        self.latency = None
+        self.in_flight = 0
+        self.healthy = True
+        self.retry_at = 0.0
+        self.requests = 0
+        self.failures = 0
+
+
+class BackendPool:
+    def __init__(self, urls, cooldown=30, smoothing=0.3):
+        """
+        Spread completions over several llama-server processes.
+
+        Args:
+            urls (list): Completion endpoints of the servers
+            cooldown (float): Seconds a failed server is avoided before it is tried again
+            smoothing (float): Weight of the newest sample in the moving average latency
+        """
+        self.backends = [Backend(url) for url in urls]
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+    def _expected_wait(self, backend, default_latency):
+        latency = default_latency if backend.latency is None else backend.latency
+        return (backend.in_flight + 1) * latency
+
+    def acquire(self, exclude=()):
+        """
+        Pick the healthy server expected to answer first and count the request
+        against it. Servers that recently failed are only used when no healthy
+        one is left. Returns None once every server is excluded.
+
+        Args:
+            exclude (iterable): Servers already tried for this request
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [backend for backend in self.backends if backend not in exclude]
+            if not candidates:
+                return None
+            available = [b for b in candidates if b.healthy or b.retry_at <= now]
+            if available:
+                # Servers without a latency sample yet are assumed to be as fast as the fastest
+                known = [b.latency for b in self.backends if b.latency is not None]
+                default_latency = min(known) if known else 1.0
+                backend = min(available, key=lambda b: self._expected_wait(b, default_latency))
+            else:
+                backend = min(candidates, key=lambda b: b.retry_at)
+            backend.in_flight += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend, latency, failed=False):
+        """
+        Record how a request to a server went.
+
+        Args:
+            backend (Backend): Server returned by acquire
+            latency (float): Seconds the request took, or None if it says
+                nothing about the server's speed, e.g. it was busy
+            failed (bool): True if the server timed out or could not be reached
+        """
+        with self._lock:
+            backend.in_flight -= 1
+            if failed:
+                backend.failures += 1
+                self._mark_down(backend)
+                return
+            if latency is None:
+                return
+            backend.healthy = True
+            if backend.latency is None:
+                backend.latency = latency
+            else:
+                backend.latency += self.smoothing * (latency - backend.latency)
+
+    def _mark_down(self, backend):
+        backend.healthy = False
+        backend.retry_at = time.monotonic() + self.cooldown
+
+    def update_health(self, backend, healthy):
+        """Record the result of a health check."""
+        with self._lock:
+            if healthy:
+                backend.healthy = True
+            else:
+                self._mark_down(backend)
+
+    def stats(self):
+        """Return latency, load and failure counters per server."""
+        with self._lock:
+            return [
+                {
+                    "url": backend.url,
+                    "healthy": backend.healthy,
+                    "latency": None if backend.latency is None else round(backend.latency, 3),
+                    "in_flight": backend.in_flight,
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                }
+                for backend in self.backends
+            ]
@@ -1,26 +1,214 @@
 import requests
 import json
+import time
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from llm_stream import iter_sse, IncrementalJSONParser, SentenceBuffer
+from intent_cache import IntentCache
+from llama_pool import BackendPool
 import config
 
+# Fields that decide which handler runs; the spoken response can follow later
+DISPATCH_FIELDS = ("action", "intent", "parameters")
+
+
+def _text(max_length):
+    return {"type": "string", "maxLength": max_length}
+
+
+# The only output the model is allowed to produce. Properties are generated
+# in this order, so the spoken response streams in last.
+ACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"enum": ["calendar", "notion", "email", "general"]},
+        "intent": {"enum": ["create", "read", "update", "delete"]},
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "summary": _text(60),
+                "start_time": _text(25),
+                "end_time": _text(25),
+                "description": _text(120),
+                "attendees": {"type": "array", "items": _text(40), "maxItems": 3},
+                "title": _text(60),
+                "due_date": _text(25),
+                "priority": {"enum": ["High", "Medium", "Low"]},
+                "to": _text(40),
+                "subject": _text(60),
+                "body": _text(200)
+            },
+            "additionalProperties": False
+        },
+        "response": _text(150)
+    },
+    "required": ["action", "intent", "parameters", "response"],
+    "additionalProperties": False
+}
+
+
+def schema_token_budget(schema, chars_per_token=3):
+    """
+    Upper bound on the tokens needed to emit any JSON value allowed by a schema.
+
+    Args:
+        schema (dict): JSON schema using enum, object, array and string with maxLength
+        chars_per_token (int): Conservative estimate of characters per token in free text
+    """
+    if "enum" in schema:
+        return max(len(json.dumps(value)) for value in schema["enum"]) // chars_per_token + 2
+    kind = schema.get("type")
+    if kind == "object":
+        # Braces, plus a quoted key, colon, comma and whitespace per property
+        return 2 + sum(
+            len(name) // chars_per_token + 4 + schema_token_budget(prop, chars_per_token)
+            for name, prop in schema.get("properties", {}).items()
+        )
+    if kind == "array":
+        return 2 + schema["maxItems"] * (schema_token_budget(schema["items"], chars_per_token) + 1)
+    if kind == "string":
+        return schema["maxLength"] // chars_per_token + 2
+    return 8
+
+
+ACTION_TOKEN_BUDGET = schema_token_budget(ACTION_SCHEMA)
+
 class LlamaClient:
     def __init__(self):
         """Initialize the Llama client."""
-        self.server_url = config.LLAMA_SERVER_URL
+        # Completions go to the least-loaded of several llama-server processes
+        self.pool = BackendPool(config.LLAMA_SERVER_URLS, cooldown=config.LLAMA_BACKEND_COOLDOWN)
         self.command_patterns = config.COMMAND_PATTERNS
+        self.timeout = (config.LLAMA_CONNECT_TIMEOUT, config.LLAMA_READ_TIMEOUT)
+        self.slot_id = config.LLAMA_SLOT_ID
+        # Built once: the server only has to evaluate it again if it changes
+        self.prompt_prefix = self._create_prompt_prefix()
+        # Repeated commands are answered without running the model
+        self.intent_cache = IntentCache(
+            config.INTENT_CACHE_PATH,
+            max_entries=config.INTENT_CACHE_SIZE,
+            ttl=config.INTENT_CACHE_TTL
+        )
 
-    def _create_prompt(self, user_input):
+        # A persistent session reuses keep-alive connections instead of
+        # paying TCP setup on every command
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.pool.backends), pool_maxsize=config.LLAMA_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def health_check(self):
+        """
+        Check every llama-server process and record which ones are up and
+        have finished loading their model. Returns True if any of them is.
+        """
+        for backend in self.pool.backends:
+            try:
+                response = self.session.get(backend.health_url, timeout=(self.timeout[0], self.timeout[0]))
+                healthy = response.status_code == 200
+            except requests.RequestException as e:
+                print(f"llama.cpp server health check failed for {backend.url}: {e}")
+                healthy = False
+            self.pool.update_health(backend, healthy)
+        return any(backend.healthy for backend in self.pool.backends)
+
+    def warm_up(self):
         """
-        Create a structured prompt for the LLM.
-        Includes context about available commands and their patterns.
+        Check the servers and evaluate the prompt prefix on each healthy one,
+        so the first real command does not pay for connection setup, model
+        loading or the prefix itself. Returns True if any server is ready.
+        """
+        if not self.health_check():
+            return False
+        ready = False
+        for backend in self.pool.backends:
+            if not backend.healthy:
+                continue
+            try:
+                response = self.session.post(
+                    backend.url,
+                    json={
+                        "prompt": self.prompt_prefix,
+                        "n_predict": 1,
+                        "cache_prompt": True,
+                        "id_slot": self.slot_id
+                    },
+                    timeout=self.timeout
+                )
+                ready = ready or response.status_code == 200
+            except requests.RequestException as e:
+                print(f"llama.cpp server warm-up failed for {backend.url}: {e}")
+                self.pool.update_health(backend, False)
+        return ready
+
+    @contextmanager
+    def _completion(self, body, stream=False):
+        """
+        Send a completion to the least-loaded server, failing over to the
+        next one when a server cannot be reached, times out or is busy
+        loading. Yields the response and records the server's latency.
+
+        Args:
+            body (dict): llama-server request body
+            stream (bool): Read the response as a stream
         """
-        prompt = f"""You are Jarvis, a privacy-focused voice assistant. Analyze the following user input and determine the appropriate action.
+        tried = set()
+        last_error = requests.ConnectionError("No llama.cpp server is configured")
+        while True:
+            backend = self.pool.acquire(exclude=tried)
+            if backend is None:
+                raise last_error
+            tried.add(backend)
+            started = time.monotonic()
+            try:
+                response = self.session.post(backend.url, json=body, timeout=self.timeout, stream=stream)
+            except requests.RequestException as e:
+                # Includes a server dying mid-response, since the body is read here unless streaming
+                print(f"llama.cpp server {backend.url} failed, trying another: {e}")
+                self.pool.release(backend, time.monotonic() - started, failed=True)
+                last_error = e
+                continue
+            except BaseException:
+                self.pool.release(backend, None)
+                raise
+
+            # 503 means the server is still loading its model or has no free slot.
+            # It is busy, not down, so it is released without a cooldown or latency sample.
+            if response.status_code == 503 and len(tried) < len(self.pool.backends):
+                response.close()
+                self.pool.release(backend, None)
+                last_error = requests.HTTPError(f"{backend.url} is unavailable", response=response)
+                continue
+
+            failed = False
+            try:
+                with response:
+                    yield response
+            except requests.RequestException:
+                failed = True
+                raise
+            finally:
+                latency = time.monotonic() - started if response.status_code == 200 else None
+                self.pool.release(backend, latency, failed=failed)
+            return
+
+    def close(self):
+        """Close the pooled connections to llama-server and the intent cache."""
+        self.session.close()
+        self.intent_cache.close()
+
+    def _create_prompt_prefix(self):
+        """
+        Create the static part of the prompt: instructions, available commands
+        and the response format. It never mentions the user input, so the
+        server can reuse its evaluated KV cache on every request.
+        """
+        return f"""You are Jarvis, a privacy-focused voice assistant. Analyze the user input and determine the appropriate action.
 Available commands:
 - Calendar (for scheduling meetings and events): {', '.join(self.command_patterns['calendar'])}
 - Notion (for creating notes and tasks): {', '.join(self.command_patterns['notion'])}
 - Email (for managing emails): {', '.join(self.command_patterns['email'])}
 
-User input: {user_input}
-
 Respond in JSON format with the following structure:
 {{
     "action": "calendar|notion|email|general",
@@ -36,101 +224,167 @@ Respond in JSON format with the following structure:
 }}
 
 Only include parameters that are relevant to the action.
+
 """
-        return prompt
+
+    def _create_prompt(self, user_input):
+        """
+        Create the prompt for a command. The user input goes last, so only
+        its few tokens are new to the server.
+        """
+        return f"{self.prompt_prefix}User input: {user_input}\nJSON:"
+
+    def _completion_request(self, user_input, stream=False):
+        """Build the llama-server request body for a command."""
+        return {
+            "prompt": self._create_prompt(user_input),
+            "temperature": 0.7,
+            # The schema is compiled to a grammar, so the model can only
+            # produce a valid action object and stops at its closing brace
+            "json_schema": ACTION_SCHEMA,
+            "n_predict": ACTION_TOKEN_BUDGET,
+            "stream": stream,
+            # Keep the evaluated prefix in the slot's KV cache between requests
+            "cache_prompt": True,
+            "id_slot": self.slot_id
+        }
 
     def process_command(self, user_input):
         """
         Process user input through the local llama.cpp server.
         Returns a structured response with action and parameters.
         """
+        result = self.intent_cache.get(user_input)
+        if result is None:
+            result = self._request_action(user_input)
+            self.intent_cache.put(user_input, result)
+        return result
+
+    def _request_action(self, user_input):
+        """Ask llama-server for the structured action of a command."""
         try:
-            prompt = self._create_prompt(user_input)
-            
-            response = requests.post(
-                self.server_url,
-                json={
-                    "prompt": prompt,
-                    "temperature": 0.7,
-                    "max_tokens": 500,
-                    "stop": ["User input:", "\n\n"]
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result.get('content', '')
+            with self._completion(self._completion_request(user_input)) as response:
+                if response.status_code == 200:
+                    result = response.json()
+                    content = result.get('content', '')
                 
-                # Default response structure
-                response_dict = {
-                    "action": "general",
-                    "intent": "create",
-                    "parameters": {},
-                    "response": content
-                }
+                    # Default response structure
+                    response_dict = {
+                        "action": "general",
+                        "intent": "create",
+                        "parameters": {},
+                        "response": ""
+                    }
                 
-                # Try to extract JSON from the response
-                try:
-                    # First try to find JSON in the content
-                    json_start = content.find('{')
-                    json_end = content.rfind('}') + 1
-                    
-                    if json_start != -1 and json_end != 0:
-                        json_str = content[json_start:json_end]
-                        parsed = json.loads(json_str)
-                        # Ensure all required keys are present
-                        response_dict.update(parsed)
+                    try:
+                        response_dict.update(json.loads(content))
                         return response_dict
-                    
-                    # If no JSON found, try to parse the content as a structured response
-                    content_lower = content.lower()
-                    
-                    # Check for calendar-related keywords first
-                    if any(word in content_lower for word in ['schedule', 'meeting', 'event', 'appointment', 'calendar']):
-                        response_dict["action"] = "calendar"
-                        response_dict["intent"] = "create"
-                        response_dict["parameters"] = {
-                            "summary": "Meeting",  # Default title
-                            "start_time": None,
-                            "end_time": None
+                    except json.JSONDecodeError as e:
+                        # Only happens if generation was cut off by n_predict
+                        print(f"Error parsing LLM response: {e}")
+                        print(f"Raw response: {result}")
+                        return {
+                            "action": "general",
+                            "intent": "error",
+                            "parameters": {},
+                            "response": "I'm having trouble processing your request. Please try again."
                         }
-                        
-                        # Extract time information
-                        if "tomorrow" in content_lower:
-                            response_dict["parameters"]["start_time"] = "tomorrow"
-                        if "2:00 p.m." in content_lower or "2 pm" in content_lower:
-                            response_dict["parameters"]["start_time"] = "14:00"
-                            
-                    # Then check for notion-related keywords
-                    elif any(word in content_lower for word in ['note', 'todo', 'task', 'reminder']):
-                        response_dict["action"] = "notion"
-                        response_dict["intent"] = "create"
-                        response_dict["parameters"] = {
-                            "title": "New Task",  # Default title
-                            "type": "todo"
-                        }
-                        
-                    # Finally check for email-related keywords
-                    elif any(word in content_lower for word in ['email', 'mail', 'inbox']):
-                        response_dict["action"] = "email"
-                        response_dict["intent"] = "create"
-                    
-                    return response_dict
-                    
-                except (json.JSONDecodeError, ValueError) as e:
-                    print(f"Error parsing LLM response: {e}")
-                    print(f"Raw response: {result}")
-                    return response_dict  # Return the default response structure
-            else:
-                print(f"Error from llama.cpp server: {response.status_code}")
-                print(f"Response content: {response.text}")
-                return {
-                    "action": "general",
-                    "intent": "error",
-                    "parameters": {},
-                    "response": "I'm having trouble processing your request. Please try again."
-                }
-                
+                else:
+                    print(f"Error from llama.cpp server: {response.status_code}")
+                    print(f"Response content: {response.text}")
+                    return {
+                        "action": "general",
+                        "intent": "error",
+                        "parameters": {},
+                        "response": "I'm having trouble processing your request. Please try again."
+                    }
+
+        except requests.Timeout as e:
+            print(f"llama.cpp server timed out: {e}")
+            return {
+                "action": "general",
+                "intent": "error",
+                "parameters": {},
+                "response": "I'm taking too long to think. Please try again."
+            }
+        except Exception as e:
+            print(f"Error communicating with llama.cpp server: {e}")
+            return {
+                "action": "general",
+                "intent": "error",
+                "parameters": {},
+                "response": "I'm having trouble connecting to my brain. Please try again."
+            }
+
+    def stream_command(self, user_input, on_action=None, on_sentence=None):
+        """
+        Process user input with a streamed completion, acting before it finishes.
+        Returns the same structured response as process_command.
+
+        Args:
+            user_input (str): The user's command
+            on_action (callable, optional): Called once with a dict of action,
+                intent and parameters as soon as all three have streamed in.
+                If it returns True the command has been dealt with, so
+                generation is stopped and the response field is left empty.
+            on_sentence (callable, optional): Called with each complete
+                sentence of the response field as it streams in
+        """
+        parser = IncrementalJSONParser()
+        sentences = SentenceBuffer()
+        spoken = 0
+        dispatched = False
+        stopped = False
+
+        def speak(new_sentences):
+            if on_sentence:
+                for sentence in new_sentences:
+                    on_sentence(sentence)
+
+        cached = self.intent_cache.get(user_input)
+        if cached is not None:
+            if on_action and on_action({field: cached[field] for field in DISPATCH_FIELDS}):
+                return cached
+            speak(sentences.feed(cached["response"]) + sentences.flush())
+            return cached
+
+        try:
+            with self._completion(self._completion_request(user_input, stream=True), stream=True) as response:
+                if response.status_code != 200:
+                    print(f"Error from llama.cpp server: {response.status_code}")
+                    return {
+                        "action": "general",
+                        "intent": "error",
+                        "parameters": {},
+                        "response": "I'm having trouble processing your request. Please try again."
+                    }
+
+                for event in iter_sse(response):
+                    parser.feed(event.get("content", ""))
+
+                    if not dispatched and all(field in parser.fields for field in DISPATCH_FIELDS):
+                        dispatched = True
+                        if on_action and on_action({field: parser.fields[field] for field in DISPATCH_FIELDS}):
+                            # Closing the stream makes llama-server stop generating
+                            stopped = True
+                            break
+
+                    text = parser.partial_string("response")
+                    if text is not None and len(text) > spoken:
+                        speak(sentences.feed(text[spoken:]))
+                        spoken = len(text)
+
+                    if event.get("stop") or parser.done:
+                        break
+
+        except requests.Timeout as e:
+            print(f"llama.cpp server timed out: {e}")
+            return {
+                "action": "general",
+                "intent": "error",
+                "parameters": {},
+                "response": "I'm taking too long to think. Please try again."
+            }
         except Exception as e:
             print(f"Error communicating with llama.cpp server: {e}")
             return {
@@ -140,6 +394,27 @@ Only include parameters that are relevant to the action.
                 "response": "I'm having trouble connecting to my brain. Please try again."
             }
 
+        if not stopped:
+            speak(sentences.flush())
+        if not parser.done and not stopped:
+            # Only happens if generation was cut off by n_predict
+            print(f"Incomplete LLM response: {parser.text}")
+            return {
+                "action": "general",
+                "intent": "error",
+                "parameters": {},
+                "response": "I'm having trouble processing your request. Please try again."
+            }
+        result = {
+            "action": "general",
+            "intent": "create",
+            "parameters": {},
+            "response": ""
+        }
+        result.update(parser.fields)
+        self.intent_cache.put(user_input, result)
+        return result
+
 if __name__ == "__main__":
     # Test LLM processing
     client = LlamaClient()
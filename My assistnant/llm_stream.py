@@ -0,0 +1,154 @@
+import re
+import json
+
+# End of a sentence: terminal punctuation followed by whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def iter_sse(response):
+    """
+    Yield the JSON payloads of a server-sent events stream.
+
+    Args:
+        response: requests.Response opened with stream=True
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return
+        yield json.loads(data)
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        """
+        Parse a JSON object as it streams in, one chunk of text at a time.
+
+        Top-level values become available in `fields` as soon as they are
+        complete, and the text of a top-level string value can be read
+        while it is still streaming.
+        """
+        self.fields = {}
+        self.text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._expect_value = False
+
+    def feed(self, chunk):
+        """Consume the next piece of streamed text."""
+        self.text += chunk
+        while self._pos < len(self.text):
+            self._step(self.text[self._pos])
+            self._pos += 1
+
+    def _step(self, char):
+        if not self._started:
+            # Skip anything the model emits before the object
+            if char == '{':
+                self._started = True
+                self._depth = 1
+            return
+
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and self._key_start is not None:
+                    self._key = json.loads(self.text[self._key_start:self._pos + 1])
+                    self._key_start = None
+                elif self._depth == 1 and self._value_start is not None:
+                    self._end_value(self._pos + 1)
+            return
+
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._key is None and self._value_start is None:
+                self._key_start = self._pos
+            elif self._depth == 1 and self._expect_value:
+                self._begin_value()
+        elif char == ':' and self._depth == 1:
+            self._expect_value = True
+        elif char in '{[':
+            if self._depth == 1 and self._expect_value:
+                self._begin_value()
+            self._depth += 1
+        elif char in '}]':
+            self._depth -= 1
+            if self._depth == 1 and self._value_start is not None:
+                self._end_value(self._pos + 1)
+            elif self._depth == 0:
+                self._end_value(self._pos)
+        elif char == ',' and self._depth == 1:
+            self._end_value(self._pos)
+        elif not char.isspace() and self._depth == 1 and self._expect_value:
+            # Start of a number, true, false or null
+            self._begin_value()
+
+    def _begin_value(self):
+        self._value_start = self._pos
+        self._expect_value = False
+
+    def _end_value(self, end):
+        if self._key is not None and self._value_start is not None:
+            try:
+                self.fields[self._key] = json.loads(self.text[self._value_start:end])
+            except json.JSONDecodeError:
+                pass
+        self._key = None
+        self._value_start = None
+        self._expect_value = False
+
+    @property
+    def done(self):
+        """True once the closing brace of the object has been seen."""
+        return self._started and self._depth == 0
+
+    def partial_string(self, key):
+        """
+        Return the text of a top-level string value so far, or None if it
+        has not started. Complete values are returned from `fields`.
+
+        Args:
+            key (str): Name of the top-level field
+        """
+        if key in self.fields:
+            value = self.fields[key]
+            return value if isinstance(value, str) else None
+        if self._key != key or self._value_start is None or not self._in_string:
+            return None
+        raw = self.text[self._value_start + 1:]
+        # Drop a trailing escape sequence that has not fully arrived
+        raw = re.sub(r'\\(u[0-9a-fA-F]{0,3})?$', '', raw)
+        try:
+            return json.loads('"' + raw + '"')
+        except json.JSONDecodeError:
+            return None
+
+
+class SentenceBuffer:
+    def __init__(self):
+        """Collect streamed text and hand it out one complete sentence at a time."""
+        self._buffer = ''
+
+    def feed(self, text):
+        """Add text and return the sentences it completed."""
+        self._buffer += text
+        parts = SENTENCE_END.split(self._buffer)
+        self._buffer = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended."""
+        rest, self._buffer = self._buffer.strip(), ''
+        return [rest] if rest else []
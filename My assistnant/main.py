@@ -4,11 +4,8 @@ import datetime
 import subprocess
 from wake_word import WakeWordDetector
 from speech_to_text import SpeechRecognizer
-from llama_request import LlamaClient
 from speak import Speaker
-from tasks.google_calendar import GoogleCalendar
-from tasks.notion_notes import NotionClient
-from tasks.gmail import GmailClient
+from tasks.services import get_service, registry
 import config
 
 class JarvisAssistant:
@@ -19,16 +16,32 @@ class JarvisAssistant:
         # Core components
         self.wake_word_detector = WakeWordDetector()
         self.speech_recognizer = SpeechRecognizer()
-        self.llama_client = LlamaClient()
         self.speaker = Speaker()
-        
-        # Task-specific components
-        self.calendar = GoogleCalendar()
-        self.notion = NotionClient()
-        self.gmail = GmailClient()
+
+        # Open the connection and load the model before the first command
+        if not self.llama_client.warm_up():
+            print("Warning: llama.cpp server is not ready, commands may be slow or fail.")
         
         print("Jarvis Assistant initialized and ready!")
 
+    # Task-specific components are created on first use and shared with the
+    # agent router through the service registry.
+    @property
+    def calendar(self):
+        return get_service("calendar")
+
+    @property
+    def notion(self):
+        return get_service("notion_notes")
+
+    @property
+    def gmail(self):
+        return get_service("gmail")
+
+    @property
+    def llama_client(self):
+        return get_service("llama")
+
     def _parse_datetime(self, time_str):
         """
         Parse datetime string into datetime object.
@@ -103,8 +116,8 @@ class JarvisAssistant:
             command (str): The user's command
         """
         try:
-            # Use the agent router to handle the command
-            result = handle_input(command)
+            # Use the agent router to handle the command; general answers are spoken as they stream in
+            result = handle_input(command, speak=self.speaker.speak)
             return result
         except Exception as e:
             return f"Sorry, I encountered an error: {str(e)}"
@@ -132,7 +145,8 @@ class JarvisAssistant:
                             
                         # Process command and get response
                         response = self.handle_command(command)
-                        self.speaker.speak(response)
+                        if response:
+                            self.speaker.speak(response)
                     
                     time.sleep(1)  # Brief pause before listening for wake word again
                     
@@ -145,6 +159,7 @@ class JarvisAssistant:
         """Clean up resources."""
         self.wake_word_detector.cleanup()
         self.speaker.cleanup()
+        registry.close()
 
     def main():
         while True:
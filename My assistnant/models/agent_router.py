@@ -1,7 +1,5 @@
-from .google_calendar import GoogleCalendar
-from .gmail import GmailClient
-from .notion_notes import NotionClient
-from .notion_tasks import NotionTasks
+from .services import get_service
+from intent_matcher import IntentMatcher
 import re
 from datetime import datetime, timedelta
 import dateutil.parser
@@ -18,12 +16,63 @@ def extract_attendees(text):
     email_pattern = r'[\w\.-]+@[\w\.-]+'
     return re.findall(email_pattern, text)
 
-def handle_calendar_command(command):
+# A clock time with an optional AM/PM marker, written "7pm", "7 PM" or "7 p.m." by speech recognition
+TIME_OF_DAY = r'(\d{1,2}(?::\d{2})?\s*(?:([ap])\.?\s?m\b\.?)?)'
+
+def parse_time_of_day(time_str):
+    """Parse a spoken time such as "3:00 PM", "3pm" or "3 p.m." into (hour, minute)."""
+    match = re.match(r'(\d{1,2})(?::(\d{2}))?\s*(?:([ap])\.?\s?m\b)?', time_str.strip(), re.IGNORECASE)
+    if not match:
+        return None
+    hour = int(match.group(1))
+    minute = int(match.group(2) or 0)
+    meridiem = (match.group(3) or '').lower()
+
+    # Handle AM/PM
+    if meridiem == 'p' and hour != 12:
+        hour += 12
+    elif meridiem == 'a' and hour == 12:
+        hour = 0
+
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour, minute
+
+def handle_availability_command(command, calendar):
+    """Answer "am I free at 3?" and "when am I free this week?" style questions."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    day = today + timedelta(days=1) if "tomorrow" in command else today
+
+    time_match = re.search(r'\bat\s+' + TIME_OF_DAY, command, re.IGNORECASE)
+    parsed = parse_time_of_day(time_match.group(1)) if time_match else None
+    if parsed:
+        hour, minute = parsed
+        # "Am I free at 3" almost always means the afternoon, unless AM or PM was said
+        if hour < 8 and not time_match.group(2):
+            hour += 12
+        start_time = day.replace(hour=hour, minute=minute)
+        conflicts = calendar.find_conflicts(start_time, start_time + timedelta(hours=1))
+        time_str = start_time.strftime('%I:%M %p').lstrip('0')
+        if not conflicts:
+            return f"You're free at {time_str}."
+        titles = ', '.join(event.get('summary', '(No title)') for event in conflicts)
+        return f"You're busy at {time_str}: {titles}."
+
+    if "week" in command:
+        return f"Here is your free time this week:\n{calendar.get_free_time(today, today + timedelta(days=7))}"
+    return f"Here is your free time:\n{calendar.get_free_time(day, day + timedelta(days=1))}"
+
+def handle_calendar_command(command, calendar=None):
     """Handle calendar-related commands."""
-    calendar = GoogleCalendar()
+    if calendar is None:
+        calendar = get_service("calendar")
     
+    # Check availability before the generic "when"/"what" viewing keywords
+    if any(word in command for word in ["free", "available", "busy"]):
+        return handle_availability_command(command, calendar)
+
     # Check for events or view calendar
-    if any(word in command for word in ["check", "show", "list", "what", "when", "see", "view", "display"]):
+    elif any(word in command for word in ["check", "show", "list", "what", "when", "see", "view", "display"]):
         # Check for specific time periods
         if "tomorrow" in command:
             events = calendar.get_events_for_tomorrow(max_results=10)
@@ -61,7 +110,7 @@ def handle_calendar_command(command):
     elif any(word in command for word in ["schedule", "create", "add", "set up", "book"]):
         # Extract date and time
         date_match = re.search(r'(?:on|for|at)\s+([^,]+)', command)
-        time_match = re.search(r'at\s+(\d{1,2}(?::\d{2})?\s*(?:AM|PM|am|pm)?)', command)
+        time_match = re.search(r'\bat\s+' + TIME_OF_DAY, command, re.IGNORECASE)
         
         # Extract title
         title_match = re.search(r'(?:schedule|create|add|set up|book)\s+(?:a|an)?\s+([^,]+)', command)
@@ -83,26 +132,10 @@ def handle_calendar_command(command):
         
         if time_match:
             time_str = time_match.group(1)
-            if time_str:
-                try:
-                    # Parse time (e.g., "3:00 PM" or "3 PM")
-                    if ":" in time_str:
-                        time_parts = time_str.split(":")
-                        hour = int(time_parts[0])
-                        minute = int(time_parts[1].split()[0])
-                    else:
-                        hour = int(time_str.split()[0])
-                        minute = 0
-                    
-                    # Handle AM/PM
-                    if "PM" in time_str.upper() and hour != 12:
-                        hour += 12
-                    elif "AM" in time_str.upper() and hour == 12:
-                        hour = 0
-                    
-                    start_time = start_time.replace(hour=hour, minute=minute)
-                except:
-                    pass  # Keep default time if parsing fails
+            # Parse time (e.g., "3:00 PM" or "3 PM"), keeping the default time if parsing fails
+            parsed = parse_time_of_day(time_str) if time_str else None
+            if parsed:
+                start_time = start_time.replace(hour=parsed[0], minute=parsed[1])
         
         end_time = start_time + timedelta(hours=1)
         
@@ -126,39 +159,131 @@ def handle_calendar_command(command):
     else:
         return "I can help you check your calendar, schedule events, or delete events. What would you like to do?"
 
-def handle_input(user_command):
+def handle_email_command(command, gmail=None):
+    """Handle email-related commands."""
+    if gmail is None:
+        gmail = get_service("gmail")
+
+    # Search mail, e.g. "find the email from sarah about the invoice"
+    if any(word in command for word in ["find", "search", "look for"]):
+        sender_match = re.search(r'\bfrom\s+([\w.@-]+)', command)
+        sender = sender_match.group(1) if sender_match else None
+        query = re.sub(r'\bfrom\s+[\w.@-]+', ' ', command)
+        query = re.sub(
+            r'\b(find|search|look|for|the|an?|my|me|in|emails?|e-mails?|g?mail|messages?|inbox|about|regarding)\b',
+            ' ',
+            query
+        )
+        return gmail.search_emails(query, sender=sender)
+
+    # Bulk label changes, e.g. "mark those as read" after hearing the unread list
+    elif "mark" in command and "read" in command:
+        if any(word in command for word in ["all", "everything", "inbox"]):
+            return gmail.mark_inbox_as_read()
+        return gmail.mark_heard_as_read()
+
+    elif "archive" in command:
+        return gmail.archive_heard()
+
+    # Delivery status of the last queued email, e.g. "did my email send?" or "was it sent?"
+    elif any(word in re.findall(r"\w+", command) for word in ["status", "did", "was", "has"]) and any(
+        phrase in command for phrase in ["send", "sent", "go out", "gone out", "went out", "deliver"]
+    ):
+        return gmail.get_delivery_status()
+
+    # "who emailed me today" and "any new mail" are answered by reading out unread mail
+    elif any(word in command for word in ["unread", "check", "read", "inbox", "new", "latest", "who"]):
+        return gmail.get_unread_emails()
+
+    elif any(word in command for word in ["send", "write", "compose"]):
+        return "Who should the email go to, and what should it say?"
+
+    # Never send mail on a command that was not understood
+    return "I can read your unread emails, search them, mark them as read, archive them, or check whether an email was sent. What would you like to do?"
+
+LIST_WORDS = re.compile(r"\b(list|show|what|which|read|recent)\b")
+
+
+def handle_notes_command(command):
+    if LIST_WORDS.search(command):
+        return get_service("notion_notes").get_recent_notes()
+    return get_service("notion_notes").create_note("Project Summary", "Discussed architecture and tasks.")
+
+
+def handle_tasks_command(command):
+    if LIST_WORDS.search(command):
+        return get_service("notion_tasks").get_task_summary()
+    task = get_service("notion_tasks").create_task("New Task", "Task description")
+    return f"Task created: {task['url']}" if task else "Sorry, I couldn't create the task."
+
+
+HANDLERS = {
+    "calendar": handle_calendar_command,
+    "email": handle_email_command,
+    "notes": handle_notes_command,
+    "tasks": handle_tasks_command,
+}
+
+# Compiled once; scores every intent in a single pass over the command
+matcher = IntentMatcher()
+
+
+def _llm_handler(action, user_command):
+    """Return the handler intent for an LLM action, or None for a general answer."""
+    if action["action"] == "notion":
+        scores = matcher.scores(user_command)
+        return "tasks" if scores.get("tasks", 0) > scores.get("notes", 0) else "notes"
+    if action["action"] in HANDLERS:
+        return action["action"]
+    return None
+
+
+def handle_input(user_command, speak=None):
+    """
+    Route a command to its handler and return the reply.
+
+    Args:
+        user_command (str): The user's command
+        speak (callable, optional): Speaks text aloud. General answers from
+            the LLM are then spoken sentence by sentence while they stream in,
+            and an empty reply is returned for them.
+    """
     user_command = user_command.lower()
-    calendar = GoogleCalendar()  # Create calendar instance
-    gmail = GmailClient()  # Create Gmail instance
-    notion_notes = NotionClient()  # Create Notion notes instance
-    notion_tasks = NotionTasks()  # Create Notion tasks instance
 
-    # Check for calendar-related commands (expanded keywords)
-    calendar_keywords = ["calendar", "schedule", "event", "events", "meeting", "appointment", "tomorrow", "today", "week", "month"]
-    if any(keyword in user_command for keyword in calendar_keywords):
-        return handle_calendar_command(user_command)
+    intent, confident = matcher.classify(user_command)
+    if confident:
+        return HANDLERS[intent](user_command)
 
-    elif "email" in user_command or "gmail" in user_command:
-        return gmail.send_email("bob@example.com", "Quick check-in", "Hey Bob, are you free to sync up tomorrow?")
+    # Ambiguous or unknown: try the example-based model before the LLM
+    predicted = get_service("intent_model").classify(user_command)
+    if predicted in HANDLERS:
+        return HANDLERS[predicted](user_command)
 
-    elif "note" in user_command:
-        return notion_notes.create_note("Project Summary", "Discussed architecture and tasks.")
-    
-    elif "task" in user_command:
-        return notion_tasks.create_task("New Task", "Task description", "High")
-
-    elif "notion" in user_command:
-        # Handle general Notion commands
-        if "list" in user_command:
-            if "tasks" in user_command:
-                return notion_tasks.get_tasks()
-            else:
-                return notion_notes.get_recent_notes()
-        elif "create" in user_command:
-            if "task" in user_command:
-                return notion_tasks.create_task("New Task", "Task description", "High")
-            else:
-                return notion_notes.create_note("New Note", "Note content")
+    # Still unsure: let the LLM decide, acting as soon as its action has streamed in
+    handled = []
+    spoken = []
 
-    else:
-        return "Sorry, I didn't understand that command."
+    def on_action(action):
+        target = _llm_handler(action, user_command)
+        if target is None:
+            return False
+        # The handler's reply replaces the LLM's, so its generation is stopped
+        handled.append(HANDLERS[target](user_command))
+        return True
+
+    def on_sentence(sentence):
+        if not handled:
+            speak(sentence)
+            spoken.append(sentence)
+
+    result = get_service("llama").stream_command(
+        user_command, on_action=on_action, on_sentence=on_sentence if speak else None
+    )
+    if handled:
+        return handled[0]
+    if result["intent"] == "error":
+        # Fall back to the best keyword guess when the LLM is unavailable
+        return HANDLERS[intent](user_command) if intent is not None else result["response"]
+    if spoken:
+        return ""
+    return result["response"] or "Sorry, I didn't understand that command."
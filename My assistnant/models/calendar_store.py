@@ -0,0 +1,101 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+
+def event_bounds(event, timezone):
+    """
+    Return the (start, end) of an event as UTC timestamps.
+
+    All-day events only carry a date, so they are anchored to midnight
+    in the calendar's timezone.
+
+    Args:
+        event (dict): Event resource from the Calendar API
+        timezone: pytz timezone used for all-day events
+    """
+    bounds = []
+    for key in ('start', 'end'):
+        value = event.get(key, {})
+        if 'dateTime' in value:
+            dt = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        else:
+            dt = timezone.localize(datetime.strptime(value['date'], '%Y-%m-%d'))
+        bounds.append(dt.timestamp())
+    return bounds[0], bounds[1]
+
+
+class CalendarStore:
+    def __init__(self, path):
+        """
+        Open (or create) the local SQLite mirror of a calendar.
+
+        Args:
+            path (str): Location of the SQLite database file
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id TEXT PRIMARY KEY, summary TEXT, start_ts REAL, end_ts REAL, data TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_start ON events (start_ts)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_meta(self, key):
+        """Return a stored metadata value, or None if it is not set."""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        """Store a metadata value such as the current sync token."""
+        with self._lock, self.conn:
+            if value is None:
+                self.conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def apply_changes(self, events, timezone):
+        """
+        Upsert changed events and drop cancelled ones.
+
+        Args:
+            events (list): Event resources returned by the Calendar API
+            timezone: pytz timezone used for all-day events
+        """
+        with self._lock, self.conn:
+            for event in events:
+                if event.get('status') == 'cancelled':
+                    self.conn.execute("DELETE FROM events WHERE id = ?", (event['id'],))
+                    continue
+                start_ts, end_ts = event_bounds(event, timezone)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO events (id, summary, start_ts, end_ts, data) VALUES (?, ?, ?, ?, ?)",
+                    (event['id'], event.get('summary', ''), start_ts, end_ts, json.dumps(event))
+                )
+
+    def delete_event(self, event_id):
+        """Remove a single event from the mirror."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+
+    def clear(self):
+        """Drop every mirrored event and the sync token."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM events")
+            self.conn.execute("DELETE FROM meta WHERE key = 'sync_token'")
+
+    def all_events(self):
+        """Return every mirrored event as (start_ts, end_ts, event) tuples."""
+        with self._lock:
+            rows = self.conn.execute("SELECT start_ts, end_ts, data FROM events").fetchall()
+        return [(start_ts, end_ts, json.loads(data)) for start_ts, end_ts, data in rows]
+
+    def close(self):
+        """Close the SQLite connection."""
+        self.conn.close()
@@ -0,0 +1,205 @@
+import re
+import bisect
+import difflib
+
+# Fuzzy title matches this close to the best one are returned with it,
+# so callers can tell that the title is ambiguous
+FUZZY_MARGIN = 0.1
+
+# Longest run of adjacent title words also indexed as one word
+MAX_JOINED_WORDS = 4
+
+
+class IntervalIndex:
+    def __init__(self, items):
+        """
+        Build a static interval index.
+
+        The intervals are sorted by start and laid out as an implicit
+        balanced tree over that array, where every node also records the
+        largest end time in its subtree. Overlap queries can then skip
+        whole subtrees and run in O(log n + k).
+
+        Args:
+            items (iterable): (start, end, value) tuples with numeric bounds
+        """
+        items = sorted(items, key=lambda item: (item[0], item[1]))
+        self.starts = [item[0] for item in items]
+        self.ends = [item[1] for item in items]
+        self.values = [item[2] for item in items]
+        self._max_end = [0.0] * len(items)
+        self._build(0, len(items))
+
+    def __len__(self):
+        return len(self.values)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return float('-inf')
+        mid = (lo + hi) // 2
+        max_end = max(self.ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlapping(self, start, end=None):
+        """
+        Return values whose interval overlaps [start, end), ordered by start.
+
+        Args:
+            start (float): Window start
+            end (float, optional): Window end, unbounded if omitted
+        """
+        # Only intervals starting before the window end can overlap it
+        limit = len(self.starts) if end is None else bisect.bisect_left(self.starts, end)
+        result = []
+        self._collect(0, len(self.starts), start, limit, result)
+        return result
+
+    def _collect(self, lo, hi, start, limit, result):
+        if lo >= hi or lo >= limit:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] <= start:
+            return
+        self._collect(lo, mid, start, limit, result)
+        if mid < limit and self.ends[mid] > start:
+            result.append(self.values[mid])
+        self._collect(mid + 1, hi, start, limit, result)
+
+
+def merge_busy(intervals):
+    """
+    Merge overlapping (start, end) intervals.
+
+    Args:
+        intervals (list): (start, end) tuples sorted by start
+    """
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def free_gaps(busy, window_start, window_end, min_duration):
+    """
+    Return the gaps between busy intervals inside a window.
+
+    Args:
+        busy (list): (start, end) tuples sorted by start
+        window_start (float): Start of the window
+        window_end (float): End of the window
+        min_duration (float): Shortest gap worth reporting
+    """
+    gaps = []
+    cursor = window_start
+    for start, end in merge_busy(busy):
+        if start >= window_end:
+            break
+        if start - cursor >= min_duration:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if window_end - cursor >= min_duration:
+        gaps.append((cursor, window_end))
+    return gaps
+
+
+def _joined_runs(words):
+    """Return the words of a title plus each run of adjacent words written as one."""
+    runs = set(words)
+    for size in range(2, MAX_JOINED_WORDS + 1):
+        runs.update("".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return runs
+
+
+def normalize_title(title):
+    """Lowercase a title and reduce punctuation and spacing to single spaces."""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", (title or "").lower()).split())
+
+
+class TitleIndex:
+    def __init__(self, items):
+        """
+        Build a lookup index over event titles.
+
+        Args:
+            items (iterable): (title, value) tuples
+        """
+        self._exact = {}
+        self._tokens = {}
+        for title, value in items:
+            normalized = normalize_title(title)
+            # Keyed without spaces so "stand-up", "stand up" and "standup" match
+            self._exact.setdefault(normalized.replace(" ", ""), []).append(value)
+            for token in _joined_runs(normalized.split()):
+                self._tokens.setdefault(token, []).append(value)
+
+    def match(self, title, where=None, cutoff=0.75):
+        """
+        Return (kind, values) for the tightest kind of match that finds anything.
+
+        Exact matches on the normalized title win, then titles containing
+        every word of the query, then the closest fuzzy matches. Spacing is
+        ignored throughout. kind is "exact", "words" or "fuzzy", or None
+        when nothing matched.
+
+        Args:
+            title (str): Title to look up
+            where (callable, optional): Only values for which this returns True
+                count, so a tier whose matches are all filtered out falls through
+            cutoff (float): Minimum similarity for fuzzy matches
+        """
+        def keep(values):
+            return [value for value in values if where is None or where(value)]
+
+        normalized = normalize_title(title)
+        if not normalized:
+            return None, []
+
+        compact = normalized.replace(" ", "")
+        exact = keep(self._exact.get(compact, []))
+        if exact:
+            return "exact", exact
+
+        # Every word of the query, or the query run together, e.g. "stand up" for "Standup"
+        for tokens in [set(normalized.split()), {compact}]:
+            postings = [self._tokens.get(token, []) for token in tokens]
+            if all(postings):
+                smallest = min(postings, key=len)
+                others = [set(map(id, posting)) for posting in postings if posting is not smallest]
+                matches = keep(value for value in smallest if all(id(value) in other for other in others))
+                if matches:
+                    return "words", matches
+
+        # Titles nearly as close as the best fuzzy match are kept, so a typo
+        # between two similar titles is not silently resolved to one of them
+        scored = []
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(compact)
+        for key, values in self._exact.items():
+            matcher.set_seq1(key)
+            # The quick upper bounds skip the full comparison for most titles
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff or not keep(values):
+                continue
+            ratio = matcher.ratio()
+            if ratio >= cutoff:
+                scored.append((ratio, key))
+        if not scored:
+            return None, []
+        scored.sort(reverse=True)
+        best = scored[0][0]
+        return "fuzzy", [
+            value for ratio, key in scored if ratio >= best - FUZZY_MARGIN for value in keep(self._exact[key])
+        ]
+
+    def lookup(self, title, cutoff=0.75):
+        """
+        Return values whose title matches, trying progressively looser matches.
+
+        Args:
+            title (str): Title to look up
+            cutoff (float): Minimum similarity for fuzzy matches
+        """
+        return self.match(title, cutoff=cutoff)[1]
@@ -2,11 +2,39 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 import os
+import time
 import base64
+import threading
 import email
+import html
 from email.mime.text import MIMEText
 import config
+from .gmail_store import GmailStore
+from .outbox import Outbox, OutboxWorker
+from .mime_decoder import extract_text, get_header
+
+# Gmail accepts at most this many IDs per batchModify call
+BATCH_MODIFY_LIMIT = 1000
+
+# Fields needed to mirror a message, including its MIME tree for the body
+MESSAGE_FIELDS = 'id,threadId,labelIds,snippet,internalDate,payload'
+
+def _message_record(msg):
+    """Convert a Gmail API message into a row for the local mirror."""
+    payload = msg.get('payload', {})
+    headers = payload.get('headers', [])
+    return {
+        'id': msg['id'],
+        'thread_id': msg.get('threadId'),
+        'internal_date': int(msg.get('internalDate', 0)),
+        'sender': get_header(headers, 'From', '(Unknown sender)'),
+        'subject': get_header(headers, 'Subject', '(No subject)'),
+        'snippet': html.unescape(msg.get('snippet', '')),
+        'body': extract_text(payload, max_chars=config.GMAIL_MAX_BODY_CHARS),
+        'labels': msg.get('labelIds', [])
+    }
 
 class GmailClient:
     def __init__(self):
@@ -14,6 +42,17 @@ class GmailClient:
         self.creds = None
         self.service = None
         self._authenticate()
+        self.store = GmailStore(config.GMAIL_CACHE_PATH)
+        self._last_sync = 0
+        self._last_unread_ids = []
+        self.outbox = Outbox(config.OUTBOX_PATH, dedupe_window=config.OUTBOX_DEDUPE_WINDOW)
+        self._outbox_worker = None
+        self._outbox_lock = threading.Lock()
+        self._send_service = None
+        self._last_outbox_id = None
+        if self.outbox.next_due() is not None:
+            # Emails queued before a restart are sent without waiting for a new one
+            self._start_outbox_worker()
 
     def _authenticate(self):
         """Handle OAuth2 authentication for Gmail."""
@@ -38,60 +77,272 @@ class GmailClient:
 
         self.service = build('gmail', 'v1', credentials=self.creds)
 
-    def get_unread_emails(self, max_results=5):
+    def close(self):
+        """Stop the outbox worker and close the Gmail service and local stores."""
+        worker_running = False
+        if self._outbox_worker is not None:
+            self._outbox_worker.stop()
+            # A send that outlasts the timeout still needs its service and the outbox
+            worker_running = self._outbox_worker.is_alive()
+            self._outbox_worker = None
+        if self._send_service is not None and not worker_running:
+            self._send_service.close()
+            self._send_service = None
+        if self.service is not None:
+            self.service.close()
+            self.service = None
+        self.store.close()
+        if not worker_running:
+            self.outbox.close()
+
+    def sync(self, force=False):
         """
-        Get unread emails from Gmail.
-        
+        Bring the local mailbox mirror up to date.
+
+        Uses users.history.list to download only the changes since the
+        last stored historyId. Falls back to a full resync when Google no
+        longer has that history (404).
+
         Args:
-            max_results (int): Maximum number of emails to return
+            force (bool): Sync even if the last sync is still recent
         """
-        try:
+        if not force and time.time() - self._last_sync < config.GMAIL_SYNC_INTERVAL:
+            return
+
+        history_id = self.store.get_meta('history_id')
+        if history_id:
+            try:
+                self._pull_history(history_id)
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                print("Gmail history expired, performing a full resync...")
+                self._full_sync()
+        else:
+            self._full_sync()
+        self._last_sync = time.time()
+
+    def _full_sync(self):
+        """Mirror recent messages from scratch."""
+        # Read the history ID first so changes made during the sync are not lost
+        profile = self.service.users().getProfile(userId='me', fields='historyId').execute()
+
+        message_ids = self._list_message_ids(
+            config.GMAIL_SYNC_MAX_MESSAGES, q=f"newer_than:{config.GMAIL_SYNC_DAYS}d"
+        )
+        # Unread mail is mirrored whatever its age, so older unread emails are still found
+        unread_ids = self._list_message_ids(config.GMAIL_SYNC_MAX_MESSAGES, labelIds=['UNREAD'])
+
+        self.store.clear()
+        if self._mirror_messages(list(dict.fromkeys(message_ids + unread_ids))):
+            self.store.set_meta('history_id', profile['historyId'])
+
+    def _list_message_ids(self, limit=None, **params):
+        """
+        Page through users.messages.list and return the matching IDs, newest first.
+
+        Args:
+            limit (int, optional): Maximum number of IDs to return
+            **params: Filters for users().messages().list(), such as q or labelIds
+        """
+        message_ids = []
+        page_token = None
+        while limit is None or len(message_ids) < limit:
             results = self.service.users().messages().list(
                 userId='me',
-                labelIds=['UNREAD'],
-                maxResults=max_results
+                maxResults=500 if limit is None else min(500, limit - len(message_ids)),
+                pageToken=page_token,
+                fields='messages/id,nextPageToken',
+                **params
             ).execute()
+            message_ids.extend(message['id'] for message in results.get('messages', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return message_ids
+
+    def _pull_history(self, start_history_id):
+        """Apply mailbox changes recorded since a history ID."""
+        added = []
+        page_token = None
+        while True:
+            results = self.service.users().history().list(
+                userId='me',
+                startHistoryId=start_history_id,
+                historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved'],
+                pageToken=page_token
+            ).execute()
+
+            for record in results.get('history', []):
+                for item in record.get('messagesAdded', []):
+                    added.append(item['message']['id'])
+                deleted = [item['message']['id'] for item in record.get('messagesDeleted', [])]
+                if deleted:
+                    added = [message_id for message_id in added if message_id not in deleted]
+                    self.store.delete_messages(deleted)
+                for item in record.get('labelsAdded', []):
+                    self.store.change_labels([item['message']['id']], add=item.get('labelIds', []))
+                for item in record.get('labelsRemoved', []):
+                    self.store.change_labels([item['message']['id']], remove=item.get('labelIds', []))
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        # New messages are fetched last so they arrive with their current labels.
+        # If some could not be fetched, the same history is replayed next time.
+        if self._mirror_messages(list(dict.fromkeys(added))):
+            self.store.set_meta('history_id', results.get('historyId', start_history_id))
+
+    def _mirror_messages(self, message_ids):
+        """
+        Download messages in batches and store them in the mirror.
+        Returns False if some could not be fetched, so the caller must not
+        store a history ID past them.
+        """
+        if not message_ids:
+            return True
+        fetched, failed = self._batch_get(message_ids, format='full', fields=MESSAGE_FIELDS)
+        self.store.upsert_messages([_message_record(msg) for msg in fetched])
+        if failed:
+            print(f"Could not fetch {len(failed)} emails, they will be retried on the next sync")
+        return not failed
+
+    def _ensure_synced(self):
+        """Sync the mirror, serving cached mail if Gmail is unreachable."""
+        try:
+            self.sync()
+        except Exception as e:
+            if self.store.get_meta('history_id') is None:
+                raise
+            print(f"Gmail sync failed, using cached emails: {str(e)}")
+
+    def _batch_get(self, message_ids, max_retries=3, **params):
+        """
+        Fetch many messages with batched HTTP requests instead of one call each.
+        Messages that fail to load, usually because of rate limiting, are
+        retried with backoff; messages deleted in the meantime are skipped.
+        Returns the fetched messages in order and the IDs that still failed.
+        
+        Args:
+            message_ids (list): IDs of the messages to fetch
+            max_retries (int): How many times to retry failed messages
+            **params: Extra arguments for users().messages().get()
+        """
+        messages = {}
+        pending = list(message_ids)
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
+
+            failed = {}
+
+            def callback(request_id, response, exception, failed=failed):
+                if exception is None:
+                    messages[request_id] = response
+                elif getattr(getattr(exception, 'resp', None), 'status', None) != 404:
+                    failed[request_id] = exception
 
-            messages = results.get('messages', [])
+            for chunk_start in range(0, len(pending), config.GMAIL_BATCH_SIZE):
+                chunk = pending[chunk_start:chunk_start + config.GMAIL_BATCH_SIZE]
+                batch = self.service.new_batch_http_request(callback=callback)
+                for message_id in chunk:
+                    batch.add(
+                        self.service.users().messages().get(userId='me', id=message_id, **params),
+                        request_id=message_id
+                    )
+                try:
+                    batch.execute()
+                except Exception as e:
+                    # The batch request itself failed; retry whatever it did not answer
+                    for message_id in chunk:
+                        if message_id not in messages:
+                            failed.setdefault(message_id, e)
+            pending = list(failed)
+
+        if pending:
+            print(f"Error fetching {len(pending)} emails: {str(failed[pending[0]])}")
+        return [messages[message_id] for message_id in message_ids if message_id in messages], pending
+
+    def get_unread_emails(self, max_results=5):
+        """
+        Get unread emails from the local mailbox mirror.
+        
+        Args:
+            max_results (int): Maximum number of emails to return
+        """
+        try:
+            self._ensure_synced()
+            messages = self.store.get_by_label('UNREAD', limit=max_results)
+            # Remember what was read out so it can be marked as read afterwards
+            self._last_unread_ids = [msg['id'] for msg in messages]
             if not messages:
                 return "No unread emails found."
 
             email_list = []
-            for message in messages:
-                msg = self.service.users().messages().get(
-                    userId='me',
-                    id=message['id'],
-                    format='full'
-                ).execute()
-
-                headers = msg['payload']['headers']
-                subject = next(h['value'] for h in headers if h['name'] == 'Subject')
-                sender = next(h['value'] for h in headers if h['name'] == 'From')
-                
-                # Get email body
-                if 'parts' in msg['payload']:
-                    parts = msg['payload']['parts']
-                    body = ''
-                    for part in parts:
-                        if part['mimeType'] == 'text/plain':
-                            body = base64.urlsafe_b64decode(
-                                part['body']['data']
-                            ).decode('utf-8')
-                            break
-                else:
-                    body = base64.urlsafe_b64decode(
-                        msg['payload']['body']['data']
-                    ).decode('utf-8')
-
-                email_list.append(f"From: {sender}\nSubject: {subject}\n\n{body[:200]}...")
+            for msg in messages:
+                preview = msg['body'] or msg['snippet']
+                email_list.append(f"From: {msg['sender']}\nSubject: {msg['subject']}\n\n{preview[:200]}...")
 
             return "\n\n".join(email_list)
         except Exception as e:
             return f"Error fetching emails: {str(e)}"
 
+    def search_emails(self, query, sender=None, max_results=5):
+        """
+        Search the local mailbox mirror.
+        
+        Args:
+            query (str): Words to look for in the sender, subject and body
+            sender (str, optional): Name or address the sender must contain
+            max_results (int): Maximum number of emails to return
+        """
+        try:
+            self._ensure_synced()
+            messages = self.store.search(query, sender=sender, limit=max_results)
+            if not messages:
+                return "No matching emails found."
+
+            email_list = []
+            for msg in messages:
+                preview = msg['body'] or msg['snippet']
+                email_list.append(f"From: {msg['sender']}\nSubject: {msg['subject']}\n\n{preview[:200]}...")
+
+            return "\n\n".join(email_list)
+        except Exception as e:
+            return f"Error searching emails: {str(e)}"
+
+    def get_email_body(self, message_id, max_chars=2000):
+        """
+        Get the plain text body of a single email.
+        The mirror is used when it has the message; otherwise it is fetched.
+        
+        Args:
+            message_id (str): ID of the email
+            max_chars (int): Maximum number of characters to return
+        """
+        try:
+            msg = self.store.get_message(message_id)
+            if msg:
+                return msg['body'][:max_chars]
+
+            msg = self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='full',
+                fields='payload'
+            ).execute()
+            return extract_text(msg['payload'], max_chars=max_chars)
+        except Exception as e:
+            return f"Error fetching email body: {str(e)}"
+
     def send_email(self, to, subject, body):
         """
-        Send an email using Gmail.
+        Queue an email for sending in the background.
+        The outbox is stored on disk, so queued emails survive restarts, and
+        identical emails queued in quick succession are only sent once.
         
         Args:
             to (str): Recipient email address
@@ -99,19 +350,86 @@ class GmailClient:
             body (str): Email body
         """
         try:
-            message = MIMEText(body)
-            message['to'] = to
-            message['subject'] = subject
+            outbox_id, duplicate = self.outbox.enqueue(to, subject, body)
+            self._last_outbox_id = outbox_id
+            self._start_outbox_worker().notify()
+            if duplicate:
+                if self.outbox.get(outbox_id)['status'] == 'sent':
+                    return f"That email to {to} was already sent."
+                return f"That email to {to} is already queued."
+            return f"Email to {to} queued for sending."
+        except Exception as e:
+            return f"Error queueing email: {str(e)}"
 
-            raw = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            self.service.users().messages().send(
-                userId='me',
-                body={'raw': raw}
-            ).execute()
+    def send_email_now(self, to, subject, body):
+        """
+        Send an email immediately, waiting for Gmail to accept it.
+        
+        Args:
+            to (str): Recipient email address
+            subject (str): Email subject
+            body (str): Email body
+        """
+        try:
+            self._deliver(to, subject, body, self.service)
             return f"Email sent successfully to {to}"
         except Exception as e:
             return f"Error sending email: {str(e)}"
 
+    def _deliver(self, to, subject, body, service=None):
+        """Send an email, raising on failure."""
+        if service is None:
+            # The outbox worker gets its own service object, because the
+            # underlying HTTP client must not be shared between threads
+            if self._send_service is None:
+                self._send_service = build('gmail', 'v1', credentials=self.creds)
+            service = self._send_service
+
+        message = MIMEText(body)
+        message['to'] = to
+        message['subject'] = subject
+
+        raw = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+        service.users().messages().send(
+            userId='me',
+            body={'raw': raw}
+        ).execute()
+
+    def _start_outbox_worker(self):
+        """Start the background outbox worker if it is not running yet."""
+        with self._outbox_lock:
+            if self._outbox_worker is None:
+                self._outbox_worker = OutboxWorker(
+                    self.outbox,
+                    self._deliver,
+                    max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+                    base_delay=config.OUTBOX_BASE_DELAY,
+                    max_delay=config.OUTBOX_MAX_DELAY
+                )
+                self._outbox_worker.start()
+            return self._outbox_worker
+
+    def get_delivery_status(self, outbox_id=None):
+        """
+        Describe the delivery state of a queued email.
+        
+        Args:
+            outbox_id (int, optional): Outbox ID, defaults to the last email queued
+        """
+        outbox_id = outbox_id or self._last_outbox_id
+        if outbox_id is None:
+            return "You haven't sent any emails yet."
+        item = self.outbox.get(outbox_id)
+        if item is None:
+            return "I couldn't find that email in the outbox."
+        if item['status'] == 'sent':
+            return f"Your email to {item['recipient']} was sent."
+        if item['status'] == 'failed':
+            return f"Your email to {item['recipient']} could not be sent: {item['error']}"
+        if item['error']:
+            return f"Your email to {item['recipient']} is still queued, retrying after an error."
+        return f"Your email to {item['recipient']} is queued."
+
     def mark_as_read(self, message_id):
         """
         Mark an email as read.
@@ -125,10 +443,96 @@ class GmailClient:
                 id=message_id,
                 body={'removeLabelIds': ['UNREAD']}
             ).execute()
+            self.store.change_labels([message_id], remove=['UNREAD'])
             return "Email marked as read"
         except Exception as e:
             return f"Error marking email as read: {str(e)}"
 
+    def modify_labels(self, message_ids, add_labels=None, remove_labels=None):
+        """
+        Add and remove labels on many emails using batchModify.
+        IDs are sent in chunks of up to 1000; a failed chunk does not stop the rest.
+        Returns a dict with the "modified" count, the "failed" IDs and the "errors".
+        
+        Args:
+            message_ids (list): IDs of the emails to change
+            add_labels (list, optional): Label IDs to add
+            remove_labels (list, optional): Label IDs to remove
+        """
+        result = {'modified': 0, 'failed': [], 'errors': []}
+        body = {}
+        if add_labels:
+            body['addLabelIds'] = list(add_labels)
+        if remove_labels:
+            body['removeLabelIds'] = list(remove_labels)
+
+        message_ids = list(dict.fromkeys(message_ids))
+        for chunk_start in range(0, len(message_ids), BATCH_MODIFY_LIMIT):
+            chunk = message_ids[chunk_start:chunk_start + BATCH_MODIFY_LIMIT]
+            try:
+                self.service.users().messages().batchModify(
+                    userId='me',
+                    body=dict(body, ids=chunk)
+                ).execute()
+                self.store.change_labels(chunk, add=add_labels or (), remove=remove_labels or ())
+                result['modified'] += len(chunk)
+            except Exception as e:
+                result['failed'].extend(chunk)
+                result['errors'].append(str(e))
+        return result
+
+    def _describe_modify(self, result, done):
+        """Turn a modify_labels() result into a spoken summary."""
+        count = result['modified']
+        message = f"{count} email{'s' if count != 1 else ''} {done}."
+        if result['failed']:
+            message += f" {len(result['failed'])} could not be updated: {result['errors'][0]}"
+        return message
+
+    def mark_all_as_read(self, message_ids):
+        """
+        Mark many emails as read.
+        
+        Args:
+            message_ids (list): IDs of the emails to mark as read
+        """
+        return self._describe_modify(self.modify_labels(message_ids, remove_labels=['UNREAD']), "marked as read")
+
+    def archive(self, message_ids):
+        """
+        Archive many emails by removing them from the inbox.
+        
+        Args:
+            message_ids (list): IDs of the emails to archive
+        """
+        return self._describe_modify(self.modify_labels(message_ids, remove_labels=['INBOX']), "archived")
+
+    def mark_heard_as_read(self):
+        """Mark the emails returned by the last get_unread_emails() call as read."""
+        if not self._last_unread_ids:
+            return "There are no emails I've read out to mark as read."
+        result = self.mark_all_as_read(self._last_unread_ids)
+        self._last_unread_ids = []
+        return result
+
+    def archive_heard(self):
+        """Archive the emails returned by the last get_unread_emails() call."""
+        if not self._last_unread_ids:
+            return "There are no emails I've read out to archive."
+        result = self.archive(self._last_unread_ids)
+        self._last_unread_ids = []
+        return result
+
+    def mark_inbox_as_read(self):
+        """Mark every unread email as read, including ones too old to be mirrored."""
+        try:
+            message_ids = self._list_message_ids(labelIds=['UNREAD'])
+            if not message_ids:
+                return "You have no unread emails."
+            return self.mark_all_as_read(message_ids)
+        except Exception as e:
+            return f"Error marking emails as read: {str(e)}"
+
 if __name__ == "__main__":
     # Test Gmail integration
     gmail = GmailClient()
@@ -0,0 +1,188 @@
+import os
+import re
+import sqlite3
+import threading
+
+
+class GmailStore:
+    def __init__(self, path):
+        """
+        Open (or create) the local SQLite mirror of a mailbox.
+
+        Args:
+            path (str): Location of the SQLite database file
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id TEXT PRIMARY KEY, thread_id TEXT, internal_date INTEGER, "
+                "sender TEXT, subject TEXT, snippet TEXT, body TEXT)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS message_labels ("
+                "message_id TEXT, label TEXT, PRIMARY KEY (message_id, label))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS labels_by_label ON message_labels (label)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._create_search_index()
+
+    def _create_search_index(self):
+        """Create the FTS5 index over sender, subject and body, kept current by triggers."""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+        ).fetchone()
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+            "sender, subject, body, content='messages', content_rowid='rowid', tokenize='porter unicode61')"
+        )
+        self.conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+            "INSERT INTO messages_fts (rowid, sender, subject, body) "
+            "VALUES (new.rowid, new.sender, new.subject, new.body); END"
+        )
+        self.conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+            "INSERT INTO messages_fts (messages_fts, rowid, sender, subject, body) "
+            "VALUES ('delete', old.rowid, old.sender, old.subject, old.body); END"
+        )
+        if not exists:
+            # Index messages mirrored before search was available
+            self.conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+    def get_meta(self, key):
+        """Return a stored metadata value, or None if it is not set."""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        """Store a metadata value such as the last history ID."""
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def upsert_messages(self, records):
+        """
+        Insert or replace mirrored messages together with their labels.
+
+        Args:
+            records (list): Dicts with id, thread_id, internal_date, sender,
+                subject, snippet, body and labels keys
+        """
+        with self._lock, self.conn:
+            for record in records:
+                # Delete explicitly: REPLACE would skip the search index delete trigger
+                self.conn.execute("DELETE FROM messages WHERE id = ?", (record['id'],))
+                self.conn.execute(
+                    "INSERT INTO messages "
+                    "(id, thread_id, internal_date, sender, subject, snippet, body) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (record['id'], record['thread_id'], record['internal_date'], record['sender'],
+                     record['subject'], record['snippet'], record['body'])
+                )
+                self.conn.execute("DELETE FROM message_labels WHERE message_id = ?", (record['id'],))
+                self.conn.executemany(
+                    "INSERT INTO message_labels (message_id, label) VALUES (?, ?)",
+                    [(record['id'], label) for label in record['labels']]
+                )
+
+    def delete_messages(self, message_ids):
+        """Remove messages from the mirror."""
+        with self._lock, self.conn:
+            for message_id in message_ids:
+                self.conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+                self.conn.execute("DELETE FROM message_labels WHERE message_id = ?", (message_id,))
+
+    def change_labels(self, message_ids, add=(), remove=()):
+        """
+        Add and remove labels on mirrored messages.
+
+        Args:
+            message_ids (list): IDs of the messages to change
+            add (iterable): Labels to add
+            remove (iterable): Labels to remove
+        """
+        with self._lock, self.conn:
+            for message_id in message_ids:
+                if not self.conn.execute("SELECT 1 FROM messages WHERE id = ?", (message_id,)).fetchone():
+                    continue
+                for label in remove:
+                    self.conn.execute(
+                        "DELETE FROM message_labels WHERE message_id = ? AND label = ?", (message_id, label)
+                    )
+                for label in add:
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO message_labels (message_id, label) VALUES (?, ?)", (message_id, label)
+                    )
+
+    def clear(self):
+        """Drop every mirrored message and the history ID."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM messages")
+            self.conn.execute("DELETE FROM message_labels")
+            self.conn.execute("DELETE FROM meta WHERE key = 'history_id'")
+
+    def get_by_label(self, label, limit=None):
+        """
+        Return mirrored messages carrying a label, newest first.
+
+        Args:
+            label (str): Gmail label ID such as "UNREAD"
+            limit (int, optional): Maximum number of messages to return
+        """
+        query = (
+            "SELECT m.* FROM messages m JOIN message_labels l ON l.message_id = m.id "
+            "WHERE l.label = ? ORDER BY m.internal_date DESC"
+        )
+        params = [label]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, text, sender=None, limit=5):
+        """
+        Full-text search over mirrored messages, best matches first.
+        Every word must match; if nothing does, any word may match.
+
+        Args:
+            text (str): Words to look for in the sender, subject and body
+            sender (str, optional): Word that must appear in the sender
+            limit (int): Maximum number of messages to return
+        """
+        words = re.findall(r"\w+", (text or "").lower())
+        sender_words = re.findall(r"\w+", (sender or "").lower())
+        if not words and not sender_words:
+            return []
+
+        sender_filter = " ".join(f'sender : "{word}"' for word in sender_words)
+        queries = [" AND ".join(filter(None, [sender_filter, " ".join(f'"{word}"' for word in words)]))]
+        if len(words) > 1:
+            any_word = "(" + " OR ".join(f'"{word}"' for word in words) + ")"
+            queries.append(" AND ".join(filter(None, [sender_filter, any_word])))
+
+        for query in queries:
+            with self._lock:
+                # Matches in the sender and subject count more than in the body
+                rows = self.conn.execute(
+                    "SELECT m.* FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+                    "WHERE messages_fts MATCH ? ORDER BY bm25(messages_fts, 10.0, 5.0, 1.0) LIMIT ?",
+                    (query, limit)
+                ).fetchall()
+            if rows:
+                return [dict(row) for row in rows]
+        return []
+
+    def get_message(self, message_id):
+        """Return a mirrored message, or None if it is not in the mirror."""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        """Close the SQLite connection."""
+        self.conn.close()
@@ -2,11 +2,35 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 import os
 import json
-from datetime import datetime, timedelta
+import time
+from itertools import islice
+from datetime import datetime, timedelta, time as day_time
 import pytz
-from config import GOOGLE_CREDENTIALS_PATH, GOOGLE_TOKEN_PATH, GOOGLE_SCOPES
+from config import (
+    GOOGLE_CREDENTIALS_PATH, GOOGLE_TOKEN_PATH, GOOGLE_SCOPES, CALENDAR_CACHE_PATH, CALENDAR_SYNC_INTERVAL,
+    CALENDAR_BATCH_SIZE, WORKDAY_START_HOUR, WORKDAY_END_HOUR
+)
+from .calendar_store import CalendarStore, event_bounds
+from .event_index import IntervalIndex, TitleIndex, free_gaps, normalize_title
+
+# Only request the event fields the assistant actually reads
+EVENT_FIELDS = 'id,status,summary,start,end,transparency'
+EVENT_LIST_FIELDS = f'items({EVENT_FIELDS}),nextPageToken,nextSyncToken'
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+def _is_retryable(exception):
+    """Return True for rate limit and transient server errors from the API."""
+    if not isinstance(exception, HttpError):
+        return False
+    if exception.resp.status == 403:
+        # Google reports quota exhaustion as 403 with a rate limit reason
+        return b'RateLimitExceeded' in exception.content or b'rateLimitExceeded' in exception.content
+    return exception.resp.status in RETRYABLE_STATUSES
 
 class GoogleCalendar:
     def __init__(self):
@@ -15,6 +39,10 @@ class GoogleCalendar:
         self.service = None
         self._authenticate()
         self.timezone = pytz.timezone('UTC')  # Default timezone
+        self.store = CalendarStore(CALENDAR_CACHE_PATH)
+        self._last_sync = 0
+        self._index = None
+        self._title_index = None
 
     def _authenticate(self):
         """Handle OAuth2 authentication for Google Calendar."""
@@ -50,31 +78,266 @@ class GoogleCalendar:
 
         self.service = build('calendar', 'v3', credentials=self.creds)
 
-    def create_event(self, summary, start_time, end_time, description=None, attendees=None):
+    def close(self):
+        """Close the underlying HTTP connections of the Calendar service."""
+        if self.service is not None:
+            self.service.close()
+            self.service = None
+        self.store.close()
+
+    def sync(self, force=False):
         """
-        Create a new calendar event.
+        Bring the local event mirror up to date.
+
+        Uses the Calendar API sync token so only changes since the last
+        sync are downloaded. Falls back to a full resync when Google
+        reports the token as expired (410 Gone).
+
+        Args:
+            force (bool): Sync even if the last sync is still recent
+        """
+        if not force and time.time() - self._last_sync < CALENDAR_SYNC_INTERVAL:
+            return
+
+        sync_token = self.store.get_meta('sync_token')
+        try:
+            self._pull_changes(sync_token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            print("Calendar sync token expired, performing a full resync...")
+            self._pull_changes(None)
+        self._last_sync = time.time()
+
+    def _pull_changes(self, sync_token):
+        """Download changed events page by page and apply them to the mirror."""
+        params = {'calendarId': 'primary', 'singleEvents': True, 'maxResults': 250}
+        if sync_token:
+            params['syncToken'] = sync_token
+        else:
+            self.store.clear()
+            self._invalidate_indexes()
+
+        for page in self._iter_pages(**params):
+            items = page.get('items', [])
+            if items:
+                self.store.apply_changes(items, self.timezone)
+                self._invalidate_indexes()
+
+        # The sync token is only returned with the last page
+        self.store.set_meta('sync_token', page.get('nextSyncToken'))
+
+    def _iter_pages(self, **params):
+        """Yield raw events().list pages, following nextPageToken."""
+        params.setdefault('fields', EVENT_LIST_FIELDS)
+        page_token = None
+        while True:
+            page = self.service.events().list(pageToken=page_token, **params).execute()
+            yield page
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                return
+
+    def iter_events(self, time_min=None, time_max=None, remote=False, page_size=50):
+        """
+        Stream events overlapping a time range, ordered by start time.
+        The caller can stop iterating at any point without paying for the rest.
         
         Args:
-            summary (str): Event title
-            start_time (datetime): Event start time
-            end_time (datetime): Event end time
-            description (str, optional): Event description
-            attendees (list, optional): List of attendee email addresses
+            time_min (datetime, optional): Range start, defaults to now
+            time_max (datetime, optional): Range end, unbounded if omitted
+            remote (bool): Page through the Calendar API instead of the local mirror
+            page_size (int): Events per API page when streaming remotely
         """
-        # Ensure times are timezone-aware
-        if start_time.tzinfo is None:
-            start_time = self.timezone.localize(start_time)
-        if end_time.tzinfo is None:
-            end_time = self.timezone.localize(end_time)
+        time_min = self._localize(time_min) if time_min else datetime.now(self.timezone)
+        time_max = self._localize(time_max) if time_max else None
+
+        if not remote:
+            self._ensure_synced()
+            yield from self._get_index().overlapping(
+                time_min.timestamp(), time_max.timestamp() if time_max else None
+            )
+            return
+
+        params = {
+            'calendarId': 'primary',
+            'timeMin': time_min.isoformat(),
+            'maxResults': page_size,
+            'singleEvents': True,
+            'orderBy': 'startTime'
+        }
+        if time_max:
+            params['timeMax'] = time_max.isoformat()
+        for page in self._iter_pages(**params):
+            yield from page.get('items', [])
+
+    def _ensure_synced(self):
+        """Sync the mirror, serving cached events if Google is unreachable."""
+        try:
+            self.sync()
+        except Exception as e:
+            if self.store.get_meta('sync_token') is None:
+                raise
+            print(f"Calendar sync failed, using cached events: {str(e)}")
+
+    def _invalidate_indexes(self):
+        """Drop the in-memory indexes so they are rebuilt from the mirror."""
+        self._index = None
+        self._title_index = None
+
+    def _get_index(self):
+        """Return the interval index over mirrored events, rebuilding it after changes."""
+        if self._index is None:
+            self._index = IntervalIndex(self.store.all_events())
+        return self._index
+
+    def _get_title_index(self):
+        """Return the title index over mirrored events, rebuilding it after changes."""
+        if self._title_index is None:
+            self._title_index = TitleIndex(
+                (event.get('summary', ''), event) for _, _, event in self.store.all_events()
+            )
+        return self._title_index
+
+    def find_event_by_title(self, event_title):
+        """
+        Find the next upcoming event matching a title.
+        Tries exact, then all-words, then fuzzy matching on the title.
+        
+        Args:
+            event_title (str): Title of the event to look for
+        """
+        return self._match_upcoming(event_title)[1]
+
+    def _match_upcoming(self, event_title):
+        """Return (kind, soonest event, matched events) for upcoming events matching a title."""
+        self._ensure_synced()
+        now = datetime.now(self.timezone).timestamp()
+        kind, events = self._get_title_index().match(
+            event_title,
+            where=lambda event: event_bounds(event, self.timezone)[1] > now
+        )
+        if not events:
+            return None, None, []
+        soonest = min(events, key=lambda event: event_bounds(event, self.timezone)[0])
+        return kind, soonest, events
+
+    def resolve_event(self, event_title):
+        """
+        Find the upcoming event a title refers to, for changes that cannot be undone.
+        Looser matches are only trusted when they all share one title, such as
+        instances of a recurring event.
+        Returns (event, choices): the event, or None and the titles it could mean.
+        
+        Args:
+            event_title (str): Title of the event to look for
+        """
+        kind, soonest, events = self._match_upcoming(event_title)
+        titles = {}
+        for event in events:
+            titles.setdefault(normalize_title(event.get('summary')), event.get('summary', ''))
+        if kind != 'exact' and len(titles) > 1:
+            return None, sorted(titles.values())
+        return soonest, []
+
+    def _localize(self, dt):
+        """Attach the calendar timezone to naive datetimes."""
+        return self.timezone.localize(dt) if dt.tzinfo is None else dt
+
+    def find_conflicts(self, start_time, end_time):
+        """
+        Get events that overlap a time range.
+        Events marked as "free" (transparent) never conflict.
+        
+        Args:
+            start_time (datetime): Start of the range
+            end_time (datetime): End of the range
+        """
+        self._ensure_synced()
+        events = self._get_index().overlapping(
+            self._localize(start_time).timestamp(),
+            self._localize(end_time).timestamp()
+        )
+        return [event for event in events if event.get('transparency') != 'transparent']
+
+    def is_free(self, start_time, end_time=None):
+        """
+        Check whether nothing is scheduled in a time range.
+        
+        Args:
+            start_time (datetime): Start of the range
+            end_time (datetime, optional): End of the range, defaults to one hour later
+        """
+        if end_time is None:
+            end_time = start_time + timedelta(hours=1)
+        return not self.find_conflicts(start_time, end_time)
+
+    def find_free_slots(self, start_date, end_date, duration_minutes=30,
+                        day_start_hour=WORKDAY_START_HOUR, day_end_hour=WORKDAY_END_HOUR):
+        """
+        Find free time within working hours for each day in a date range.
+        Returns a list of (start, end) datetime tuples.
+        
+        Args:
+            start_date (datetime): First day to search
+            end_date (datetime): Day after the last day to search
+            duration_minutes (int): Shortest free slot to report
+            day_start_hour (int): Hour the working day starts
+            day_end_hour (int): Hour the working day ends
+        """
+        self._ensure_synced()
+        index = self._get_index()
+        now = datetime.now(self.timezone).timestamp()
+        slots = []
+
+        day = start_date.date()
+        while day < end_date.date():
+            window_start = max(self.timezone.localize(datetime.combine(day, day_time(day_start_hour))).timestamp(), now)
+            window_end = self.timezone.localize(datetime.combine(day, day_time(day_end_hour))).timestamp()
+            if window_end > window_start:
+                busy = [
+                    event_bounds(event, self.timezone)
+                    for event in index.overlapping(window_start, window_end)
+                    if event.get('transparency') != 'transparent'
+                ]
+                for gap_start, gap_end in free_gaps(busy, window_start, window_end, duration_minutes * 60):
+                    slots.append((
+                        datetime.fromtimestamp(gap_start, self.timezone),
+                        datetime.fromtimestamp(gap_end, self.timezone)
+                    ))
+            day += timedelta(days=1)
+
+        return slots
+
+    def get_free_time(self, start_date, end_date, duration_minutes=30):
+        """
+        Describe free time within working hours for a date range.
+        
+        Args:
+            start_date (datetime): First day to search
+            end_date (datetime): Day after the last day to search
+            duration_minutes (int): Shortest free slot to report
+        """
+        try:
+            slots = self.find_free_slots(start_date, end_date, duration_minutes)
+            if not slots:
+                return "You have no free time in that period."
+            return "\n".join(
+                f"{start.strftime('%Y-%m-%d %H:%M')} - {end.strftime('%H:%M')}" for start, end in slots
+            )
+        except Exception as e:
+            return f"Error finding free time: {str(e)}"
 
+    def _event_body(self, summary, start_time, end_time, description=None, attendees=None):
+        """Build the request body for a new event."""
         event = {
             'summary': summary,
             'start': {
-                'dateTime': start_time.isoformat(),
+                'dateTime': self._localize(start_time).isoformat(),
                 'timeZone': str(self.timezone),
             },
             'end': {
-                'dateTime': end_time.isoformat(),
+                'dateTime': self._localize(end_time).isoformat(),
                 'timeZone': str(self.timezone),
             },
         }
@@ -85,8 +348,52 @@ class GoogleCalendar:
         if attendees:
             event['attendees'] = [{'email': email} for email in attendees]
 
+        return event
+
+    def _event_changes(self, new_summary=None, new_start_time=None, new_end_time=None, new_description=None):
+        """Build a patch body holding only the changed event fields."""
+        changes = {}
+        if new_summary:
+            changes['summary'] = new_summary
+        if new_start_time:
+            changes['start'] = {
+                'dateTime': self._localize(new_start_time).isoformat(),
+                'timeZone': str(self.timezone)
+            }
+        if new_end_time:
+            changes['end'] = {
+                'dateTime': self._localize(new_end_time).isoformat(),
+                'timeZone': str(self.timezone)
+            }
+        if new_description:
+            changes['description'] = new_description
+        return changes
+
+    def create_event(self, summary, start_time, end_time, description=None, attendees=None, allow_conflicts=True):
+        """
+        Create a new calendar event.
+        
+        Args:
+            summary (str): Event title
+            start_time (datetime): Event start time
+            end_time (datetime): Event end time
+            description (str, optional): Event description
+            attendees (list, optional): List of attendee email addresses
+            allow_conflicts (bool): Create the event even if it overlaps another one
+        """
+        # Ensure times are timezone-aware
+        start_time = self._localize(start_time)
+        end_time = self._localize(end_time)
+        event = self._event_body(summary, start_time, end_time, description, attendees)
+
         try:
-            event = self.service.events().insert(calendarId='primary', body=event).execute()
+            conflicts = [c.get('summary', '(No title)') for c in self.find_conflicts(start_time, end_time)]
+            if conflicts and not allow_conflicts:
+                return f"The event '{summary}' was not created because it overlaps with {', '.join(conflicts)}."
+
+            event = self.service.events().insert(calendarId='primary', body=event, fields=EVENT_FIELDS).execute()
+            self.store.apply_changes([event], self.timezone)
+            self._invalidate_indexes()
             
             # Format the time for user-friendly message
             start_time_str = start_time.strftime('%I:%M %p')
@@ -100,6 +407,9 @@ class GoogleCalendar:
                 message += f" with {', '.join(attendees)}"
             
             message += "."
+
+            if conflicts:
+                message += f" Note that it overlaps with {', '.join(conflicts)}."
             
             return message
         except Exception as e:
@@ -118,24 +428,25 @@ class GoogleCalendar:
             # Set time range for filtering
             if start_date and end_date:
                 # Filter events between specific dates
-                time_min = start_date.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-                time_max = end_date.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat()
+                time_min = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+                time_max = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
             else:
                 # Get events from now onwards
-                time_min = datetime.now(self.timezone).isoformat()
+                time_min = None
                 time_max = None
             
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=time_min,
-                timeMax=time_max,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            if not events:
+            events = self.iter_events(time_min, time_max)
+            event_list = []
+            for event in islice(events, max_results):
+                start = event['start'].get('dateTime', event['start'].get('date'))
+                if 'dateTime' in event['start']:
+                    # Convert to local timezone
+                    start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+                    start_dt = start_dt.astimezone(self.timezone)
+                    start = start_dt.strftime('%Y-%m-%d %H:%M')
+                event_list.append(f"{start}: {event.get('summary', '(No title)')}")
+
+            if not event_list:
                 if start_date and end_date:
                     date_str = start_date.strftime('%B %d')
                     if start_date.date() == end_date.date():
@@ -144,16 +455,10 @@ class GoogleCalendar:
                         return f"No events found between {start_date.strftime('%B %d')} and {end_date.strftime('%B %d')}."
                 else:
                     return "No upcoming events found."
-            
-            event_list = []
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                if 'dateTime' in event['start']:
-                    # Convert to local timezone
-                    start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                    start_dt = start_dt.astimezone(self.timezone)
-                    start = start_dt.strftime('%Y-%m-%d %H:%M')
-                event_list.append(f"{start}: {event['summary']}")
+
+            # Let the user know the list was cut short rather than silently truncating it
+            if next(events, None) is not None:
+                event_list.append("There are more events not listed.")
             
             return "\n".join(event_list)
         except Exception as e:
@@ -211,24 +516,11 @@ class GoogleCalendar:
             event_title (str): Title of the event to delete
         """
         try:
-            # First, find the event
-            now = datetime.now(self.timezone).isoformat()
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=now,
-                maxResults=10,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            event_to_delete = None
-            
-            for event in events:
-                if event['summary'].lower() == event_title.lower():
-                    event_to_delete = event
-                    break
+            # First, find the event in the local mirror
+            event_to_delete, choices = self.resolve_event(event_title)
             
+            if choices:
+                return f"Which one: {', '.join(choices)}?"
             if not event_to_delete:
                 return f"No event found with title: {event_title}"
             
@@ -237,8 +529,10 @@ class GoogleCalendar:
                 calendarId='primary',
                 eventId=event_to_delete['id']
             ).execute()
+            self.store.delete_event(event_to_delete['id'])
+            self._invalidate_indexes()
             
-            return f"Successfully deleted event: {event_title}"
+            return f"Successfully deleted event: {event_to_delete.get('summary', event_title)}"
         except Exception as e:
             return f"Error deleting event: {str(e)}"
 
@@ -254,58 +548,158 @@ class GoogleCalendar:
             new_description (str, optional): New description
         """
         try:
-            # First, find the event
-            now = datetime.now(self.timezone).isoformat()
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=now,
-                maxResults=10,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            event_to_update = None
-            
-            for event in events:
-                if event['summary'].lower() == event_title.lower():
-                    event_to_update = event
-                    break
+            # First, find the event in the local mirror
+            event_to_update, choices = self.resolve_event(event_title)
             
+            if choices:
+                return f"Which one: {', '.join(choices)}?"
             if not event_to_update:
                 return f"No event found with title: {event_title}"
             
-            # Update the event
-            if new_summary:
-                event_to_update['summary'] = new_summary
-            if new_start_time:
-                if new_start_time.tzinfo is None:
-                    new_start_time = self.timezone.localize(new_start_time)
-                event_to_update['start'] = {
-                    'dateTime': new_start_time.isoformat(),
-                    'timeZone': str(self.timezone)
-                }
-            if new_end_time:
-                if new_end_time.tzinfo is None:
-                    new_end_time = self.timezone.localize(new_end_time)
-                event_to_update['end'] = {
-                    'dateTime': new_end_time.isoformat(),
-                    'timeZone': str(self.timezone)
-                }
-            if new_description:
-                event_to_update['description'] = new_description
+            # Send only the changed fields; the mirror holds a trimmed copy
+            # of the event, so it must not be sent back as a full update
+            changes = self._event_changes(new_summary, new_start_time, new_end_time, new_description)
             
             # Save the updated event
-            updated_event = self.service.events().update(
+            updated_event = self.service.events().patch(
                 calendarId='primary',
                 eventId=event_to_update['id'],
-                body=event_to_update
+                body=changes,
+                fields=EVENT_FIELDS
             ).execute()
+            self.store.apply_changes([updated_event], self.timezone)
+            self._invalidate_indexes()
             
             return f"Successfully updated event: {updated_event.get('summary')}"
         except Exception as e:
             return f"Error updating event: {str(e)}"
 
+    def batch_mutate(self, operations, max_retries=3):
+        """
+        Apply many creates, updates and deletes using batched HTTP requests.
+        Failed items with a retryable status are retried with backoff.
+        Returns one result dict per operation, in order, with keys
+        "action", "ok" and either "event" or "error".
+        
+        Args:
+            operations (list): Dicts with an "action" of "create", "update" or "delete".
+                Creates take the create_event arguments. Updates and deletes take
+                "event_id" or "event_title", and updates also take the update_event
+                "new_*" arguments.
+            max_retries (int): How many times to retry retryable failures
+        """
+        results = [None] * len(operations)
+        requests = {}
+        event_ids = {}
+
+        for i, op in enumerate(operations):
+            action = op.get('action')
+            try:
+                if action == 'create':
+                    body = self._event_body(
+                        op['summary'], op['start_time'], op['end_time'],
+                        op.get('description'), op.get('attendees')
+                    )
+                    requests[i] = lambda body=body: self.service.events().insert(
+                        calendarId='primary', body=body, fields=EVENT_FIELDS
+                    )
+                elif action in ('update', 'delete'):
+                    event_id = op.get('event_id')
+                    if not event_id:
+                        event, choices = self.resolve_event(op.get('event_title', ''))
+                        if choices:
+                            raise ValueError(f"Which one: {', '.join(choices)}?")
+                        if not event:
+                            raise ValueError(f"No event found with title: {op.get('event_title')}")
+                        event_id = event['id']
+                    event_ids[i] = event_id
+                    if action == 'update':
+                        changes = self._event_changes(
+                            op.get('new_summary'), op.get('new_start_time'),
+                            op.get('new_end_time'), op.get('new_description')
+                        )
+                        requests[i] = lambda event_id=event_id, changes=changes: self.service.events().patch(
+                            calendarId='primary', eventId=event_id, body=changes, fields=EVENT_FIELDS
+                        )
+                    else:
+                        requests[i] = lambda event_id=event_id: self.service.events().delete(
+                            calendarId='primary', eventId=event_id
+                        )
+                else:
+                    raise ValueError(f"Unknown action: {action}")
+            except Exception as e:
+                results[i] = {'action': action, 'ok': False, 'error': str(e)}
+
+        pending = sorted(requests)
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
+
+            retry = []
+            for chunk_start in range(0, len(pending), CALENDAR_BATCH_SIZE):
+                chunk = pending[chunk_start:chunk_start + CALENDAR_BATCH_SIZE]
+                responses = {}
+
+                def callback(request_id, response, exception, responses=responses):
+                    responses[int(request_id)] = (response, exception)
+
+                batch = self.service.new_batch_http_request(callback=callback)
+                for i in chunk:
+                    batch.add(requests[i](), request_id=str(i))
+                try:
+                    batch.execute()
+                    batch_error = Exception("No response in batch")
+                except Exception as e:
+                    # The batch request itself failed; items it did not answer share its error
+                    batch_error = e
+
+                for i in chunk:
+                    response, exception = responses.get(i, (None, batch_error))
+                    action = operations[i]['action']
+                    status = getattr(getattr(exception, 'resp', None), 'status', None)
+                    # A dropped connection may have applied a create, so only resend idempotent calls
+                    transient = _is_retryable(exception) or (
+                        isinstance(exception, OSError) and action != 'create'
+                    )
+                    if exception is None or (action == 'delete' and status in (404, 410)):
+                        results[i] = {'action': action, 'ok': True, 'event': response}
+                    elif transient and attempt < max_retries:
+                        retry.append(i)
+                    else:
+                        results[i] = {'action': action, 'ok': False, 'error': str(exception)}
+            pending = retry
+
+        # Keep the mirror in step with what Google accepted
+        changed = [r['event'] for r in results if r['ok'] and r['action'] != 'delete' and r['event']]
+        if changed:
+            self.store.apply_changes(changed, self.timezone)
+        for i, result in enumerate(results):
+            if result['ok'] and result['action'] == 'delete':
+                self.store.delete_event(event_ids[i])
+        self._invalidate_indexes()
+
+        return results
+
+    def create_events(self, events):
+        """
+        Create many events in batched requests.
+        
+        Args:
+            events (list): Dicts with the create_event arguments
+        """
+        return self.batch_mutate([dict(event, action='create') for event in events])
+
+    def delete_events(self, event_titles):
+        """
+        Delete many events by title in batched requests.
+        
+        Args:
+            event_titles (list): Titles of the events to delete
+        """
+        return self.batch_mutate([{'action': 'delete', 'event_title': title} for title in event_titles])
+
 if __name__ == "__main__":
     # Test Google Calendar integration
     calendar = GoogleCalendar()
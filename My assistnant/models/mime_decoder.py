@@ -0,0 +1,146 @@
+import re
+import base64
+import codecs
+from html.parser import HTMLParser
+
+# HTML tags whose content is never spoken
+SKIPPED_TAGS = {'script', 'style', 'head', 'title'}
+
+# HTML tags that start a new line of text
+BLOCK_TAGS = {'br', 'p', 'div', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote'}
+
+
+def get_header(headers, name, default=None):
+    """
+    Return the value of a message header, ignoring case.
+
+    Args:
+        headers (list): Header dicts with "name" and "value" keys
+        name (str): Header name
+        default: Value returned when the header is missing
+    """
+    name = name.lower()
+    for header in headers or []:
+        if header.get('name', '').lower() == name:
+            return header.get('value', default)
+    return default
+
+
+def iter_parts(payload):
+    """
+    Walk a Gmail message payload depth-first, yielding leaf parts lazily.
+
+    Args:
+        payload (dict): The "payload" of a Gmail API message
+    """
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get('parts')
+        if children:
+            # Reversed so parts come out in their original order
+            stack.extend(reversed(children))
+        else:
+            yield part
+
+
+def _charset(part):
+    """Return the charset declared in a part's Content-Type header."""
+    content_type = get_header(part.get('headers'), 'Content-Type', '')
+    match = re.search(r'charset="?([\w.:-]+)"?', content_type, re.IGNORECASE)
+    charset = match.group(1) if match else 'utf-8'
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = 'utf-8'
+    return charset
+
+
+def decode_part(part, max_bytes):
+    """
+    Decode at most max_bytes of a part's body into text.
+    Only the needed prefix of the base64 data is decoded.
+
+    Args:
+        part (dict): Leaf part of a Gmail message payload
+        max_bytes (int): Maximum number of decoded bytes to read
+    """
+    data = part.get('body', {}).get('data')
+    if not data:
+        return ''
+
+    # Every 4 base64 characters decode to 3 bytes
+    prefix = data[:(max_bytes + 2) // 3 * 4]
+    prefix += '=' * (-len(prefix) % 4)
+    raw = base64.urlsafe_b64decode(prefix)[:max_bytes]
+
+    # An incremental decoder drops a multi-byte character cut off at the end
+    decoder = codecs.getincrementaldecoder(_charset(part))(errors='replace')
+    return decoder.decode(raw, final=len(raw) < max_bytes)
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.chunks.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self.chunks.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.chunks.append(data)
+
+
+def html_to_text(markup):
+    """Strip tags, scripts and styles from HTML, keeping line breaks between blocks."""
+    parser = _TextExtractor()
+    parser.feed(markup)
+    parser.close()
+    lines = (' '.join(line.split()) for line in ''.join(parser.chunks).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def _is_attachment(part):
+    disposition = get_header(part.get('headers'), 'Content-Disposition', '')
+    return bool(part.get('filename')) or disposition.lower().startswith('attachment')
+
+
+def extract_text(payload, max_chars=2000):
+    """
+    Return up to max_chars of readable text from a Gmail message payload.
+
+    Prefers the first text/plain part and falls back to the first
+    text/html part with its markup stripped. Attachments are skipped and
+    only as much of the body as needed is decoded, so the cost does not
+    grow with the size of the message.
+
+    Args:
+        payload (dict): The "payload" of a Gmail API message
+        max_chars (int): Maximum number of characters to return
+    """
+    html_part = None
+    for part in iter_parts(payload):
+        if _is_attachment(part):
+            continue
+        mime_type = part.get('mimeType', '').lower()
+        if mime_type == 'text/plain' and part.get('body', {}).get('data'):
+            # UTF-8 needs at most 4 bytes per character
+            return decode_part(part, max_chars * 4)[:max_chars]
+        if mime_type == 'text/html' and html_part is None:
+            html_part = part
+
+    if html_part is None:
+        return ''
+    # Markup usually outweighs the text, so read further into HTML bodies
+    return html_to_text(decode_part(html_part, max_chars * 16))[:max_chars]
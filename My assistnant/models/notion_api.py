@@ -0,0 +1,118 @@
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from notion_client import Client
+from notion_client.errors import APIResponseError
+
+# Status codes Notion asks us to retry; server errors only for reads,
+# since a failed write may still have been applied
+RATE_LIMITED = 429
+RETRYABLE_READ_STATUSES = {500, 502, 503, 504}
+
+# Notion rejects rich text items longer than this
+MAX_TEXT_LENGTH = 2000
+
+
+def _retry_after(error):
+    """Return the Retry-After delay of a response error in seconds, or None."""
+    value = (getattr(error, "headers", None) or {}).get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def paragraph_block(text):
+    """
+    Build a paragraph block, splitting text that is too long for one rich text item.
+
+    Args:
+        text (str): Paragraph content
+    """
+    chunks = [text[i:i + MAX_TEXT_LENGTH] for i in range(0, len(text), MAX_TEXT_LENGTH)] or [""]
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {
+            "rich_text": [{"type": "text", "text": {"content": chunk}} for chunk in chunks]
+        }
+    }
+
+
+def create_pages(client, payloads, max_workers=3):
+    """
+    Create several pages concurrently. Requests still pass through the
+    client's rate limiter, so this only overlaps their latency.
+    Returns one dict per page, in order, with "page" and "error" keys.
+
+    Args:
+        client: notion_client.Client instance
+        payloads (list): Zero-argument callables returning the keyword
+            arguments of each pages.create call, so an invalid item fails alone
+        max_workers (int): Requests in flight at once
+    """
+    def create(build_payload):
+        try:
+            return {"page": client.pages.create(**build_payload()), "error": None}
+        except Exception as e:
+            return {"page": None, "error": str(e)}
+
+    if len(payloads) <= 1:
+        return [create(build_payload) for build_payload in payloads]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notion-create") as executor:
+        return list(executor.map(create, payloads))
+
+
+class RateLimitedClient(Client):
+    def __init__(self, limiter, max_retries=5, base_delay=1, max_delay=30, **kwargs):
+        """
+        Notion client whose requests all pass through a shared token bucket.
+
+        Args:
+            limiter (TokenBucket): Limiter shared by every Notion caller
+            max_retries (int): Retries of a throttled or failed request
+            base_delay (float): Backoff before the first retry, doubled on each attempt
+            max_delay (float): Upper bound on the backoff in seconds
+            **kwargs: Options passed to notion_client.Client, such as auth
+        """
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def request(self, path, method, *args, **kwargs):
+        """Send a request, waiting for the limiter and retrying when throttled."""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                return super().request(path, method, *args, **kwargs)
+            except APIResponseError as e:
+                retryable = e.status == RATE_LIMITED or (
+                    method.upper() == "GET" and e.status in RETRYABLE_READ_STATUSES
+                )
+                if not retryable or attempt >= self.max_retries:
+                    raise
+
+                delay = _retry_after(e)
+                if delay is None:
+                    backoff = min(self.base_delay * 2 ** attempt, self.max_delay)
+                    delay = backoff * random.uniform(0.5, 1.0)
+                if e.status == RATE_LIMITED:
+                    # Hold back every thread, not just this one
+                    self.limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+
+    def get_stats(self):
+        """Return counters on requests sent and time spent throttled."""
+        return self.limiter.stats()
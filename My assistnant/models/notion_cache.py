@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone, timedelta
+from .notion_query import iter_query, project_page
+
+# last_edited_time is only precise to the minute, so incremental syncs overlap a little
+SYNC_OVERLAP = timedelta(minutes=2)
+
+
+class NotionCache:
+    def __init__(self, path, database_id, sync_interval=30, full_refresh_interval=21600):
+        """
+        Open (or create) the local SQLite cache of a Notion database.
+
+        Args:
+            path (str): Location of the SQLite database file
+            database_id (str): ID of the Notion database being cached
+            sync_interval (int): Seconds between incremental syncs
+            full_refresh_interval (int): Seconds between full refreshes, which
+                also drop pages that were deleted or archived in Notion
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.database_id = database_id
+        self.sync_interval = sync_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0
+        with self._lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "id TEXT PRIMARY KEY, database_id TEXT, url TEXT, title TEXT, status TEXT, "
+                "due_date TEXT, priority TEXT, date TEXT, tags TEXT, last_edited_time TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS pages_by_database ON pages (database_id)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (database_id TEXT, key TEXT, value TEXT, "
+                "PRIMARY KEY (database_id, key))"
+            )
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE database_id = ? AND key = ?", (self.database_id, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (database_id, key, value) VALUES (?, ?, ?)",
+                (self.database_id, key, value)
+            )
+
+    def upsert_pages(self, pages, replace_all=False):
+        """
+        Store Notion pages in the cache.
+
+        Args:
+            pages (list): Page objects returned by the Notion API
+            replace_all (bool): Drop every other cached page of the database first
+        """
+        with self._lock, self.conn:
+            if replace_all:
+                self.conn.execute("DELETE FROM pages WHERE database_id = ?", (self.database_id,))
+            for page in pages:
+                if page.get("archived") or page.get("in_trash"):
+                    self.conn.execute("DELETE FROM pages WHERE id = ?", (page["id"],))
+                    continue
+                record = project_page(page)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO pages (id, database_id, url, title, status, due_date, priority, "
+                    "date, tags, last_edited_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record["id"], self.database_id, record["url"], record["title"], record["status"],
+                     record["due_date"], record["priority"], record["date"], json.dumps(record["tags"]),
+                     record["last_edited_time"])
+                )
+
+    def sync(self, client, force=False):
+        """
+        Bring the cache up to date with Notion.
+
+        Only pages edited since the last sync are fetched, except for the
+        periodic full refresh.
+
+        Args:
+            client: notion_client.Client instance
+            force (bool): Sync even if the last sync is still recent
+        """
+        with self._sync_lock:
+            if not force and time.time() - self._last_sync < self.sync_interval:
+                return
+
+            started = datetime.now(timezone.utc)
+            last_sync = self._get_meta("last_sync")
+            last_full = float(self._get_meta("last_full_refresh") or 0)
+
+            if last_sync is None or time.time() - last_full > self.full_refresh_interval:
+                self.upsert_pages(list(iter_query(client, self.database_id)), replace_all=True)
+                self._set_meta("last_full_refresh", str(time.time()))
+            else:
+                since = datetime.fromisoformat(last_sync) - SYNC_OVERLAP
+                changed = iter_query(
+                    client,
+                    self.database_id,
+                    filter={
+                        "timestamp": "last_edited_time",
+                        "last_edited_time": {"on_or_after": since.isoformat()}
+                    }
+                )
+                self.upsert_pages(list(changed))
+
+            self._set_meta("last_sync", started.isoformat())
+            self._last_sync = time.time()
+
+    def refresh(self, client):
+        """Sync the cache, serving cached pages if Notion is unreachable."""
+        try:
+            self.sync(client)
+        except Exception as e:
+            if self._get_meta("last_sync") is None:
+                raise
+            print(f"Notion sync failed, using cached pages: {str(e)}")
+
+    def _records(self, rows):
+        return [dict(row, tags=json.loads(row["tags"] or "[]")) for row in rows]
+
+    def tasks(self, filter_status=None, limit=None):
+        """
+        Return cached tasks as compact records, soonest due first.
+
+        Args:
+            filter_status (str, optional): Only return tasks with this status
+            limit (int, optional): Maximum number of tasks to return
+        """
+        query = "SELECT * FROM pages WHERE database_id = ?"
+        params = [self.database_id]
+        if filter_status:
+            query += " AND status = ?"
+            params.append(filter_status)
+        # Tasks without a due date come last, as they do in Notion
+        query += " ORDER BY due_date IS NULL, due_date"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._records(self.conn.execute(query, params).fetchall())
+
+    def recent_notes(self, limit=5):
+        """
+        Return cached notes as compact records, newest first.
+
+        Args:
+            limit (int): Maximum number of notes to return
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM pages WHERE database_id = ? ORDER BY date IS NULL, date DESC LIMIT ?",
+                (self.database_id, limit)
+            ).fetchall()
+        return self._records(rows)
+
+    def close(self):
+        """Close the SQLite connection."""
+        self.conn.close()
@@ -1,12 +1,26 @@
-from notion_client import Client
 import config
 from datetime import datetime
+from functools import partial
+from .notion_api import create_pages, paragraph_block
+from .notion_query import iter_query, project_page
+from .services import get_service
 
 class NotionClient:
     def __init__(self):
-        """Initialize Notion client with API key."""
-        self.notion = Client(auth=config.get_notion_client())
+        """Initialize Notion client with the shared rate-limited connection."""
+        self.notion = get_service("notion_client")
         self.database_id = config.NOTION_DATABASE_ID
+        # Shared with NotionTasks, which reads the same database
+        self.cache = get_service("notion_cache")
+        self.schema = get_service("notion_schema")
+
+    def _note_payload(self, title, content, tags=None):
+        """Build the pages.create arguments for a note, content included."""
+        return {
+            "parent": {"database_id": self.database_id},
+            "properties": self.schema.build_properties(title, {"Date": datetime.now(), "Tags": tags or None}),
+            "children": [paragraph_block(content)]
+        }
 
     def create_note(self, title, content, tags=None):
         """
@@ -18,52 +32,31 @@ class NotionClient:
             tags (list, optional): List of tags
         """
         try:
-            properties = {
-                "Name": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": title
-                            }
-                        }
-                    ]
-                },
-                "Date": {
-                    "date": {
-                        "start": datetime.now().isoformat()
-                    }
-                }
-            }
-
-            if tags:
-                properties["Tags"] = {
-                    "multi_select": [{"name": tag} for tag in tags]
-                }
-
-            page = self.notion.pages.create(
-                parent={"database_id": self.database_id},
-                properties=properties,
-                children=[
-                    {
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {
-                            "rich_text": [
-                                {
-                                    "type": "text",
-                                    "text": {
-                                        "content": content
-                                    }
-                                }
-                            ]
-                        }
-                    }
-                ]
-            )
+            page = self.notion.pages.create(**self._note_payload(title, content, tags))
+            self.cache.upsert_pages([page])
             return f"Note created successfully: {page['url']}"
         except Exception as e:
+            self.schema.note_failure(e)
             return f"Error creating note: {str(e)}"
 
+    def create_notes(self, notes):
+        """
+        Create several notes concurrently under the shared rate limit.
+        Returns one dict per note, in order, with title, page and error keys.
+        
+        Args:
+            notes (list): Dicts with a title, content and optional tags
+        """
+        results = create_pages(
+            self.notion,
+            [partial(self._note_payload, note["title"], note["content"], note.get("tags")) for note in notes],
+            max_workers=config.NOTION_BULK_WORKERS
+        )
+        self.cache.upsert_pages([result["page"] for result in results if result["page"]])
+        for note, result in zip(notes, results):
+            result["title"] = note["title"]
+        return results
+
     def create_todo(self, title, due_date=None, priority=None):
         """
         Create a new todo item in Notion.
@@ -74,69 +67,53 @@ class NotionClient:
             priority (str, optional): Priority level (High, Medium, Low)
         """
         try:
-            properties = {
-                "Name": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": title
-                            }
-                        }
-                    ]
-                },
-                "Status": {
-                    "select": {
-                        "name": "To Do"
-                    }
-                }
-            }
-
-            if due_date:
-                properties["Due Date"] = {
-                    "date": {
-                        "start": due_date
-                    }
-                }
-
-            if priority:
-                properties["Priority"] = {
-                    "select": {
-                        "name": priority
-                    }
-                }
-
+            properties = self.schema.build_properties(
+                title,
+                {"Status": "To Do", "Due Date": due_date, "Priority": priority}
+            )
             page = self.notion.pages.create(
                 parent={"database_id": self.database_id},
                 properties=properties
             )
+            self.cache.upsert_pages([page])
             return f"Todo created successfully: {page['url']}"
         except Exception as e:
+            self.schema.note_failure(e)
             return f"Error creating todo: {str(e)}"
 
+    def iter_notes(self, page_size=100):
+        """
+        Stream notes from Notion as compact records, newest first.
+        
+        Args:
+            page_size (int): Pages requested per API call
+        """
+        pages = iter_query(
+            self.notion,
+            self.database_id,
+            page_size=page_size,
+            sorts=[
+                {
+                    "property": "Date",
+                    "direction": "descending"
+                }
+            ]
+        )
+        for page in pages:
+            yield project_page(page)
+
     def get_recent_notes(self, limit=5):
         """
-        Get recent notes from Notion.
+        Get recent notes from the local Notion cache.
         
         Args:
             limit (int): Maximum number of notes to return
         """
         try:
-            response = self.notion.databases.query(
-                database_id=self.database_id,
-                page_size=limit,
-                sorts=[
-                    {
-                        "property": "Date",
-                        "direction": "descending"
-                    }
-                ]
-            )
-
+            self.cache.refresh(self.notion)
             notes = []
-            for page in response["results"]:
-                title = page["properties"]["Name"]["title"][0]["text"]["content"]
-                date = page["properties"]["Date"]["date"]["start"]
-                notes.append(f"{date}: {title}")
+            for note in self.cache.recent_notes(limit):
+                notes.append(f"{note['date']}: {note['title']}")
 
             return "\n".join(notes) if notes else "No recent notes found."
         except Exception as e:
@@ -0,0 +1,77 @@
+def iter_query(client, database_id, page_size=100, **query):
+    """
+    Stream every page of a Notion database query, following next_cursor.
+    Pages are fetched one batch at a time, so callers can stop early.
+
+    Args:
+        client: notion_client.Client instance
+        database_id (str): ID of the database to query
+        page_size (int): Pages requested per call (Notion allows up to 100)
+        **query: Extra query arguments such as filter and sorts
+    """
+    cursor = None
+    while True:
+        params = dict(query, database_id=database_id, page_size=page_size)
+        if cursor:
+            params["start_cursor"] = cursor
+        response = client.databases.query(**params)
+        yield from response["results"]
+        if not response.get("has_more"):
+            return
+        cursor = response["next_cursor"]
+
+
+def _plain_text(rich_text):
+    return "".join(
+        item.get("plain_text") or item.get("text", {}).get("content", "")
+        for item in rich_text or []
+    )
+
+
+def property_value(prop):
+    """
+    Reduce a Notion page property to a plain Python value.
+
+    Args:
+        prop (dict): Property value from a page's "properties"
+    """
+    if not prop:
+        return None
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if kind in ("title", "rich_text"):
+        return _plain_text(value)
+    if kind in ("select", "status"):
+        return value["name"] if value else None
+    if kind == "multi_select":
+        return [option["name"] for option in value or []]
+    if kind == "date":
+        return value["start"] if value else None
+    if kind in ("checkbox", "number", "url", "email", "phone_number", "created_time", "last_edited_time"):
+        return value
+    return None
+
+
+def project_page(page):
+    """
+    Convert a Notion page into a compact record of the fields the assistant uses.
+
+    Args:
+        page (dict): Page object returned by the Notion API
+    """
+    properties = page.get("properties", {})
+    title = next(
+        (_plain_text(prop["title"]) for prop in properties.values() if prop.get("type") == "title"),
+        ""
+    )
+    return {
+        "id": page["id"],
+        "url": page.get("url"),
+        "title": title,
+        "status": property_value(properties.get("Status")),
+        "due_date": property_value(properties.get("Due Date")),
+        "priority": property_value(properties.get("Priority")),
+        "date": property_value(properties.get("Date")),
+        "tags": property_value(properties.get("Tags")) or [],
+        "last_edited_time": page.get("last_edited_time"),
+    }
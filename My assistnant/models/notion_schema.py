@@ -0,0 +1,119 @@
+import time
+import threading
+from datetime import date
+
+# Property types whose option names must already exist in the database.
+# Unknown select and multi-select options are added by Notion instead.
+FIXED_OPTION_TYPES = {"status"}
+
+
+def _normalize(name):
+    return " ".join(name.lower().split())
+
+
+class NotionSchema:
+    def __init__(self, client, database_id, ttl=3600):
+        """
+        Cached schema of a Notion database, used to shape page properties locally.
+
+        Args:
+            client: notion_client.Client instance
+            database_id (str): ID of the database
+            ttl (int): Seconds before the schema is fetched again
+        """
+        self.client = client
+        self.database_id = database_id
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._properties = None
+        self._title_name = None
+        self._fetched = 0
+
+    def _load(self):
+        """Fetch the schema and precompute lookups by normalized property and option name."""
+        database = self.client.databases.retrieve(database_id=self.database_id)
+        properties = {}
+        title_name = None
+        for name, prop in database["properties"].items():
+            kind = prop["type"]
+            options = {
+                _normalize(option["name"]): option["name"]
+                for option in (prop.get(kind) or {}).get("options", [])
+            }
+            properties[_normalize(name)] = (name, kind, options)
+            if kind == "title":
+                title_name = name
+        self._properties = properties
+        self._title_name = title_name
+        self._fetched = time.time()
+
+    def _schema(self):
+        with self._lock:
+            if self._properties is None or time.time() - self._fetched > self.ttl:
+                self._load()
+            return self._properties, self._title_name
+
+    def invalidate(self):
+        """Fetch the schema again on next use, e.g. after the database was edited."""
+        with self._lock:
+            self._properties = None
+
+    def note_failure(self, error):
+        """Invalidate the schema if Notion rejected a payload built from it."""
+        if getattr(error, "code", None) == "validation_error":
+            self.invalidate()
+
+    def get_type(self, name):
+        """Return the type of a property, or None if the database has no such property."""
+        properties, _ = self._schema()
+        prop = properties.get(_normalize(name))
+        return prop[1] if prop else None
+
+    def build_properties(self, title, values=None):
+        """
+        Shape page properties to match the database.
+
+        Property and option names are matched ignoring case. Properties the
+        database does not have are dropped with a warning, so a write never
+        fails on them.
+
+        Args:
+            title (str): Value of the database's title property
+            values (dict, optional): Plain values keyed by property name; None values are skipped
+
+        Raises:
+            ValueError: If a status option does not exist in the database
+        """
+        properties, title_name = self._schema()
+        shaped = {title_name: {"title": [{"text": {"content": title}}]}}
+
+        for name, value in (values or {}).items():
+            if value is None:
+                continue
+            prop = properties.get(_normalize(name))
+            if prop is None:
+                print(f"Notion database has no property {name!r}, skipping it")
+                continue
+            real_name, kind, options = prop
+            shaped[real_name] = self._shape(real_name, kind, options, value)
+        return shaped
+
+    def _shape(self, name, kind, options, value):
+        if kind in ("select", "status", "multi_select"):
+            names = value if isinstance(value, (list, tuple)) else [value]
+            resolved = []
+            for option in names:
+                match = options.get(_normalize(option))
+                if match is None and kind in FIXED_OPTION_TYPES:
+                    raise ValueError(f"{option!r} is not a valid {name}; choose from {', '.join(options.values())}")
+                resolved.append(match or option)
+            if kind == "multi_select":
+                return {kind: [{"name": option} for option in resolved]}
+            return {kind: {"name": resolved[0]}}
+        if kind == "date":
+            return {"date": {"start": value.isoformat() if isinstance(value, date) else value}}
+        if kind in ("rich_text", "title"):
+            return {kind: [{"text": {"content": str(value)}}]}
+        if kind in ("checkbox", "number", "url", "email", "phone_number"):
+            return {kind: value}
+        raise ValueError(f"Cannot set {name}: {kind} properties are not supported")
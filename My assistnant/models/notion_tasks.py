@@ -1,87 +1,107 @@
-from notion_client import Client
-from config import NOTION_API_KEY, NOTION_DATABASE_ID
+from functools import partial
+from config import NOTION_DATABASE_ID, NOTION_BULK_WORKERS
+from .notion_api import create_pages, paragraph_block
+from .notion_query import iter_query, project_page
+from .services import get_service
 
 class NotionTasks:
     def __init__(self):
-        self.client = Client(auth=NOTION_API_KEY)
+        # One rate-limited client is shared by every Notion integration
+        self.client = get_service("notion_client")
         self.database_id = NOTION_DATABASE_ID
+        # Shared with NotionClient, which reads the same database
+        self.cache = get_service("notion_cache")
+        self.schema = get_service("notion_schema")
+
+    def _task_payload(self, title, description=None, due_date=None):
+        """Build the pages.create arguments for a task, description included."""
+        payload = {
+            "parent": {"database_id": self.database_id},
+            "properties": self.schema.build_properties(title, {"Due Date": due_date})
+        }
+        # Sending the description with the page saves a blocks.children.append call
+        if description:
+            payload["children"] = [paragraph_block(description)]
+        return payload
 
     def create_task(self, title, description=None, due_date=None):
         """Create a new task in Notion."""
         try:
-            properties = {
-                "Name": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": title
-                            }
-                        }
-                    ]
-                }
-            }
-
-            if due_date:
-                properties["Due Date"] = {
-                    "date": {
-                        "start": due_date.isoformat()
-                    }
-                }
-
-            page = self.client.pages.create(
-                parent={"database_id": self.database_id},
-                properties=properties
-            )
-
-            if description:
-                self.client.blocks.children.append(
-                    block_id=page["id"],
-                    children=[
-                        {
-                            "object": "block",
-                            "type": "paragraph",
-                            "paragraph": {
-                                "rich_text": [
-                                    {
-                                        "type": "text",
-                                        "text": {
-                                            "content": description
-                                        }
-                                    }
-                                ]
-                            }
-                        }
-                    ]
-                )
-
+            page = self.client.pages.create(**self._task_payload(title, description, due_date))
+            self.cache.upsert_pages([page])
             return page
         except Exception as e:
+            self.schema.note_failure(e)
             print(f"Error creating Notion task: {str(e)}")
             return None
 
-    def get_tasks(self, filter_status=None):
-        """Get tasks from Notion database."""
-        try:
-            query = {
-                "database_id": self.database_id,
-                "sorts": [
-                    {
-                        "property": "Due Date",
-                        "direction": "ascending"
-                    }
-                ]
-            }
+    def create_tasks(self, tasks):
+        """
+        Create several tasks concurrently under the shared rate limit.
+        Returns one dict per task, in order, with title, page and error keys.
+
+        Args:
+            tasks (list): Dicts with a title and optional description and due_date
+        """
+        results = create_pages(
+            self.client,
+            [partial(self._task_payload, task["title"], task.get("description"), task.get("due_date")) for task in tasks],
+            max_workers=NOTION_BULK_WORKERS
+        )
+        self.cache.upsert_pages([result["page"] for result in results if result["page"]])
+        for task, result in zip(tasks, results):
+            result["title"] = task["title"]
+            if result["error"]:
+                print(f"Error creating Notion task {task['title']!r}: {result['error']}")
+        return results
+
+    def iter_tasks(self, filter_status=None, page_size=100):
+        """
+        Stream tasks from Notion as compact records, soonest due first.
+        Each record has id, url, title, status, due_date, priority, date, tags
+        and last_edited_time keys.
+        """
+        query = {
+            "sorts": [
+                {
+                    "property": "Due Date",
+                    "direction": "ascending"
+                }
+            ]
+        }
 
-            if filter_status:
-                query["filter"] = {
-                    "property": "Status",
-                    "select": {
-                        "equals": filter_status
-                    }
+        if filter_status:
+            # Status may be a select or a status property depending on the database
+            query["filter"] = {
+                "property": "Status",
+                self.schema.get_type("Status") or "select": {
+                    "equals": filter_status
                 }
+            }
+
+        for page in iter_query(self.client, self.database_id, page_size=page_size, **query):
+            yield project_page(page)
 
-            response = self.client.databases.query(**query)
-            return response["results"]
+    def get_tasks(self, filter_status=None, limit=None):
+        """Get tasks from the local Notion cache as compact records."""
+        try:
+            self.cache.refresh(self.client)
+            return self.cache.tasks(filter_status, limit)
         except Exception as e:
             print(f"Error getting Notion tasks: {str(e)}")
-            return [] 
\ No newline at end of file
+            return []
+
+    def get_task_summary(self, filter_status=None, limit=10):
+        """Describe upcoming tasks in a form suitable for speaking."""
+        tasks = self.get_tasks(filter_status, limit=limit)
+        if not tasks:
+            return "No tasks found."
+        lines = []
+        for task in tasks:
+            line = task["title"]
+            if task["due_date"]:
+                line += f" (due {task['due_date']})"
+            if task["status"]:
+                line += f" - {task['status']}"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,179 @@
+import os
+import time
+import random
+import hashlib
+import sqlite3
+import threading
+
+
+class Outbox:
+    def __init__(self, path, dedupe_window=600):
+        """
+        Open (or create) the on-disk queue of outgoing emails.
+
+        Args:
+            path (str): Location of the SQLite database file
+            dedupe_window (int): Seconds during which an identical email is not sent again
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.dedupe_window = dedupe_window
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            # WAL with full sync keeps queued emails safe across crashes
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=FULL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, dedupe_key TEXT, recipient TEXT, subject TEXT, "
+                "body TEXT, status TEXT, attempts INTEGER DEFAULT 0, next_attempt REAL, "
+                "created REAL, updated REAL, error TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_by_status ON outbox (status, next_attempt)")
+            # Emails that were mid-send when the process died are retried
+            self.conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+
+    def enqueue(self, to, subject, body):
+        """
+        Queue an email, unless an identical one is already queued or was just sent.
+        Returns a tuple of (outbox_id, is_duplicate).
+
+        Args:
+            to (str): Recipient email address
+            subject (str): Email subject
+            body (str): Email body
+        """
+        key = hashlib.sha256("\0".join([to.strip().lower(), subject, body]).encode('utf-8')).hexdigest()
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT id FROM outbox WHERE dedupe_key = ? AND "
+                "(status IN ('pending', 'sending') OR (status = 'sent' AND updated > ?)) "
+                "ORDER BY id DESC LIMIT 1",
+                (key, now - self.dedupe_window)
+            ).fetchone()
+            if row:
+                return row['id'], True
+            cursor = self.conn.execute(
+                "INSERT INTO outbox (dedupe_key, recipient, subject, body, status, next_attempt, created, updated) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+                (key, to, subject, body, now, now, now)
+            )
+            return cursor.lastrowid, False
+
+    def claim_next(self):
+        """Mark the next due email as sending and return it, or None if nothing is due."""
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt <= ? ORDER BY next_attempt LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated = ? WHERE id = ?",
+                (time.time(), row['id'])
+            )
+            return dict(row, attempts=row['attempts'] + 1)
+
+    def mark_sent(self, outbox_id):
+        """Record a successful delivery."""
+        self._set_status(outbox_id, 'sent', None)
+
+    def mark_failed(self, outbox_id, error):
+        """Record that an email will not be retried."""
+        self._set_status(outbox_id, 'failed', error)
+
+    def mark_retry(self, outbox_id, error, delay):
+        """
+        Put an email back in the queue after a failed attempt.
+
+        Args:
+            outbox_id (int): ID of the queued email
+            error (str): Error from the failed attempt
+            delay (float): Seconds to wait before the next attempt
+        """
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'pending', error = ?, next_attempt = ?, updated = ? WHERE id = ?",
+                (error, time.time() + delay, time.time(), outbox_id)
+            )
+
+    def _set_status(self, outbox_id, status, error):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, error = ?, updated = ? WHERE id = ?",
+                (status, error, time.time(), outbox_id)
+            )
+
+    def get(self, outbox_id):
+        """Return a queued email and its delivery state, or None if unknown."""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM outbox WHERE id = ?", (outbox_id,)).fetchone()
+        return dict(row) if row else None
+
+    def next_due(self):
+        """Return when the next pending email is due, or None if the queue is empty."""
+        with self._lock:
+            row = self.conn.execute("SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'").fetchone()
+        return row[0]
+
+    def close(self):
+        """Close the SQLite connection."""
+        self.conn.close()
+
+
+class OutboxWorker(threading.Thread):
+    def __init__(self, outbox, send, max_attempts=6, base_delay=2, max_delay=300):
+        """
+        Background thread that drains the outbox.
+
+        Args:
+            outbox (Outbox): Queue to drain
+            send (callable): Function taking (to, subject, body) that raises on failure
+            max_attempts (int): Attempts before an email is given up on
+            base_delay (float): Delay before the first retry, doubled on each attempt
+            max_delay (float): Upper bound on the retry delay
+        """
+        super().__init__(name="gmail-outbox", daemon=True)
+        self.outbox = outbox
+        self.send = send
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def notify(self):
+        """Wake the worker because a new email was queued."""
+        self._wakeup.set()
+
+    def stop(self, timeout=5):
+        """Stop the worker, letting an in-progress send finish."""
+        self._stopping.set()
+        self._wakeup.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            item = self.outbox.claim_next()
+            if item is None:
+                next_due = self.outbox.next_due()
+                timeout = None if next_due is None else max(0.0, next_due - time.time())
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+                continue
+
+            try:
+                self.send(item['recipient'], item['subject'], item['body'])
+                self.outbox.mark_sent(item['id'])
+            except Exception as e:
+                status = getattr(getattr(e, 'resp', None), 'status', None)
+                permanent = status is not None and 400 <= status < 500 and status != 429
+                if permanent or item['attempts'] >= self.max_attempts:
+                    print(f"Giving up on email to {item['recipient']}: {str(e)}")
+                    self.outbox.mark_failed(item['id'], str(e))
+                else:
+                    delay = min(self.base_delay * 2 ** (item['attempts'] - 1), self.max_delay)
+                    self.outbox.mark_retry(item['id'], str(e), delay * random.uniform(0.5, 1.0))
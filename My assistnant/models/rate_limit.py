@@ -0,0 +1,71 @@
+import time
+import threading
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Thread-safe token bucket shared by every caller of an API.
+
+        Args:
+            rate (float): Tokens added per second, i.e. the sustained request rate
+            capacity (float, optional): Largest burst allowed, defaults to one second of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Condition()
+        self.requests = 0
+        self.throttled_requests = 0
+        self.throttled_time = 0.0
+        self.rate_limited = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent. Returns the seconds spent waiting."""
+        started = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+                # Waiting releases the lock, so a pause() from another thread is seen
+                self._lock.wait(delay)
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                self.throttled_requests += 1
+                self.throttled_time += waited
+        return waited
+
+    def pause(self, seconds):
+        """
+        Hold back every caller, e.g. when the server answers with Retry-After.
+
+        Args:
+            seconds (float): How long no request may be sent
+        """
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # Refill from an empty bucket once the pause ends, so resumed traffic is not a burst
+            self._tokens = 0
+            self._updated = self._paused_until
+
+    def stats(self):
+        """Return request, throttling and rate-limit counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled_requests": self.throttled_requests,
+                "throttled_time": round(self.throttled_time, 3),
+                "rate_limited": self.rate_limited,
+            }
@@ -0,0 +1,160 @@
+import threading
+
+
+class ServiceRegistry:
+    def __init__(self):
+        """Initialize an empty registry of lazily created services."""
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        """
+        Register a factory for a named service.
+
+        Args:
+            name (str): Name used to look the service up
+            factory (callable): Zero-argument callable that builds the service
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def _service_lock(self, name):
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Unknown service: {name}")
+            return self._locks[name]
+
+    def get(self, name):
+        """
+        Return the shared instance of a service, creating it on first use.
+
+        Args:
+            name (str): Name of the service
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        # Each service has its own lock so a slow OAuth flow for one
+        # integration does not block callers of another.
+        with self._service_lock(name):
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = self._factories[name]()
+                self._instances[name] = instance
+            return instance
+
+    def is_active(self, name):
+        """Return True if the service has already been created."""
+        return name in self._instances
+
+    def refresh(self, name):
+        """
+        Close the current instance of a service and build a new one.
+
+        Args:
+            name (str): Name of the service
+        """
+        with self._service_lock(name):
+            self._close_instance(self._instances.pop(name, None))
+            instance = self._factories[name]()
+            self._instances[name] = instance
+            return instance
+
+    def close(self, name=None):
+        """
+        Close one service, or every active service when no name is given.
+
+        Args:
+            name (str, optional): Name of the service to close
+        """
+        names = [name] if name else list(self._instances)
+        for service_name in names:
+            with self._service_lock(service_name):
+                self._close_instance(self._instances.pop(service_name, None))
+
+    def _close_instance(self, instance):
+        close = getattr(instance, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing service: {str(e)}")
+
+
+# Factories import lazily so a command only pays the import and
+# authentication cost of the integration it actually uses.
+def _create_calendar():
+    from .google_calendar import GoogleCalendar
+    return GoogleCalendar()
+
+def _create_gmail():
+    from .gmail import GmailClient
+    return GmailClient()
+
+def _create_notion_client():
+    import config
+    from .notion_api import RateLimitedClient
+    from .rate_limit import TokenBucket
+    return RateLimitedClient(
+        TokenBucket(config.NOTION_RATE_LIMIT, config.NOTION_BURST),
+        max_retries=config.NOTION_MAX_RETRIES,
+        max_delay=config.NOTION_MAX_BACKOFF,
+        auth=config.get_notion_client()
+    )
+
+def _create_notion_schema():
+    import config
+    from .notion_schema import NotionSchema
+    return NotionSchema(get_service("notion_client"), config.NOTION_DATABASE_ID, ttl=config.NOTION_SCHEMA_TTL)
+
+def _create_notion_notes():
+    from .notion_notes import NotionClient
+    return NotionClient()
+
+def _create_notion_tasks():
+    from .notion_tasks import NotionTasks
+    return NotionTasks()
+
+def _create_notion_cache():
+    import config
+    from .notion_cache import NotionCache
+    return NotionCache(
+        config.NOTION_CACHE_PATH,
+        config.NOTION_DATABASE_ID,
+        sync_interval=config.NOTION_SYNC_INTERVAL,
+        full_refresh_interval=config.NOTION_FULL_REFRESH_INTERVAL
+    )
+
+
+def _create_intent_model():
+    import config
+    from intent_model import IntentModel
+    return IntentModel.from_jsonl(
+        config.INTENT_EXAMPLES_PATH,
+        threshold=config.INTENT_MODEL_THRESHOLD,
+        min_margin=config.INTENT_MODEL_MARGIN
+    )
+
+def _create_llama():
+    from llama_request import LlamaClient
+    return LlamaClient()
+
+
+registry = ServiceRegistry()
+registry.register("calendar", _create_calendar)
+registry.register("gmail", _create_gmail)
+registry.register("notion_client", _create_notion_client)
+registry.register("notion_schema", _create_notion_schema)
+registry.register("notion_notes", _create_notion_notes)
+registry.register("notion_tasks", _create_notion_tasks)
+registry.register("notion_cache", _create_notion_cache)
+registry.register("intent_model", _create_intent_model)
+registry.register("llama", _create_llama)
+
+def get_service(name):
+    """Return the process-wide instance of a registered service."""
+    return registry.get(name)
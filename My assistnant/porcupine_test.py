@@ -5,6 +5,9 @@ import config
 import os
 import speech_recognition as sr
 import time
+from intent_matcher import IntentMatcher
+
+matcher = IntentMatcher()
 
 def listen_for_command():
     """Listen for a command after wake word is detected."""
@@ -72,11 +75,12 @@ def test_wake_word():
                 
                 if command:
                     # Process the command
-                    if any(word in command for word in config.COMMAND_PATTERNS["calendar"]):
+                    intent, _ = matcher.classify(command)
+                    if intent == "calendar":
                         print("Processing calendar command...")
-                    elif any(word in command for word in config.COMMAND_PATTERNS["notion"]):
+                    elif intent in ("notes", "tasks"):
                         print("Processing Notion command...")
-                    elif any(word in command for word in config.COMMAND_PATTERNS["email"]):
+                    elif intent == "email":
                         print("Processing email command...")
                     else:
                         print("Command not recognized")
@@ -7,13 +7,13 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from tasks.google_calendar import GoogleCalendar
+from tasks.services import get_service
 
 def test_calendar():
     """Test the Google Calendar functionality."""
     try:
         print("Initializing Google Calendar...")
-        calendar = GoogleCalendar()
+        calendar = get_service("calendar")
         print("✓ Google Calendar initialized successfully")
         
         print("\nTesting get_upcoming_events...")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the calendar interval index and free time helpers
+"""
+
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.event_index import IntervalIndex, TitleIndex, merge_busy, free_gaps
+
+def test_overlap_matches_brute_force():
+    """Compare interval index queries with a linear scan over random intervals."""
+    try:
+        rng = random.Random(42)
+        for size in [0, 1, 2, 7, 100, 500]:
+            items = []
+            for value in range(size):
+                start = rng.uniform(0, 1000)
+                items.append((start, start + rng.choice([0.5, 5, 50, 400]), value))
+            index = IntervalIndex(items)
+
+            for _ in range(200):
+                start = rng.uniform(-50, 1050)
+                end = start + rng.uniform(0, 200) if rng.random() < 0.8 else None
+                expected = sorted(
+                    (s, e, value) for s, e, value in items
+                    if e > start and (end is None or s < end)
+                )
+                got = index.overlapping(start, end)
+                if got != [value for _, _, value in expected]:
+                    print(f"✗ {size} intervals, window {start}-{end}: expected "
+                          f"{[value for _, _, value in expected]}, got {got}")
+                    return False
+        print("✓ overlapping() matches a brute force scan")
+
+        # Touching intervals do not overlap: [10, 20) and [20, 30)
+        index = IntervalIndex([(10, 20, "a"), (20, 30, "b")])
+        if index.overlapping(20, 25) != ["b"] or index.overlapping(5, 10) != []:
+            print("✗ Half-open bounds are not respected")
+            return False
+        print("✓ Interval bounds are half-open")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_free_gaps():
+    """Check merging of busy times and the gaps left between them."""
+    try:
+        merged = merge_busy([(1, 3), (2, 5), (5, 6), (8, 9)])
+        if merged != [[1, 6], [8, 9]]:
+            print(f"✗ merge_busy: got {merged}")
+            return False
+        print("✓ merge_busy joins overlapping and touching intervals")
+
+        gaps = free_gaps([(9, 10), (9.5, 11), (13, 14)], 8, 17, 1)
+        if gaps != [(8, 9), (11, 13), (14, 17)]:
+            print(f"✗ free_gaps: got {gaps}")
+            return False
+        print("✓ free_gaps finds the gaps around merged busy times")
+
+        # Gaps shorter than the minimum are dropped, and busy time outside the window is ignored
+        gaps = free_gaps([(6, 8.5), (9, 12), (12.5, 16), (18, 20)], 8, 17, 1)
+        if gaps != [(16, 17)]:
+            print(f"✗ free_gaps with a minimum duration: got {gaps}")
+            return False
+        if free_gaps([], 8, 17, 1) != [(8, 17)]:
+            print("✗ free_gaps without busy times should return the whole window")
+            return False
+        print("✓ free_gaps respects the minimum duration and the window")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_title_lookup():
+    """Check the title matching that deletes and updates rely on."""
+    try:
+        def match(titles, query, where=None):
+            kind, values = TitleIndex((title, title) for title in titles).match(query, where=where)
+            return kind, sorted(values)
+
+        cases = [
+            (["Team Standup", "Standup review"], "team stand-up", ("exact", ["Team Standup"])),
+            (["Team Meeting", "Project meeting"], "meeting", ("words", ["Project meeting", "Team Meeting"])),
+            (["Team Standup", "Standup with Bob"], "stand-up", ("words", ["Standup with Bob", "Team Standup"])),
+            (["Standup with Bob", "Lunch"], "stand up with bob", ("exact", ["Standup with Bob"])),
+            (["Budget review", "Budget reviews"], "budget revew", ("fuzzy", ["Budget review", "Budget reviews"])),
+            (["Dentist", "Budget review"], "dentst", ("fuzzy", ["Dentist"])),
+            (["Dentist"], "quarterly planning", (None, [])),
+        ]
+        for titles, query, expected in cases:
+            result = match(titles, query)
+            if result != expected:
+                print(f"✗ {query!r} in {titles}: expected {expected}, got {result}")
+                return False
+        print("✓ Exact, word and fuzzy matches ignore spacing and keep ambiguous candidates")
+
+        # Filtered out matches fall through to the next tier instead of hiding it
+        result = match(["Standup", "Standup review"], "standup", where=lambda title: title != "Standup")
+        if result != ("words", ["Standup review"]):
+            print(f"✗ A filtered exact match should fall through, got {result}")
+            return False
+        print("✓ A tier whose matches are all filtered out falls through")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing Calendar Interval Index")
+    print("=" * 40)
+
+    success = test_overlap_matches_brute_force()
+    success = test_free_gaps() and success
+    success = test_title_lookup() and success
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")
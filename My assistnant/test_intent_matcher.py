@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for keyword based intent matching
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from intent_matcher import IntentMatcher
+
+def test_default_keywords():
+    """Check routing of common commands with the keywords from config."""
+    try:
+        matcher = IntentMatcher()
+        cases = [
+            ("what meetings do I have tomorrow", ("calendar", True)),
+            ("am I free on friday", ("calendar", True)),
+            ("check my emails", ("email", True)),
+            ("mark it read", ("email", True)),
+            ("add a to do for groceries", ("tasks", True)),
+            ("add a task to my notion", ("tasks", True)),
+            ("create a note in notion", ("notes", True)),
+            # Two intents tie, so the LLM decides
+            ("schedule an email", ("calendar", False)),
+            ("what is the weather", (None, False)),
+        ]
+        for command, expected in cases:
+            result = matcher.classify(command)
+            if result != expected:
+                print(f"✗ {command!r}: expected {expected}, got {result}")
+                return False
+        print(f"✓ {len(cases)} commands routed as expected")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_scoring():
+    """Check word boundaries, plurals, repeats and multi-word keywords."""
+    try:
+        matcher = IntentMatcher(
+            keywords={
+                "email": {"mail": 1.0, "email": 1.0},
+                "tasks": {"task": 1.0, "to do": 1.0},
+                "notes": {"note": 1.0},
+            },
+            min_score=1.0,
+            min_margin=0.5
+        )
+        if matcher.scores("send an email") != {"email": 1.0}:
+            print(f"✗ \"email\" should not also count as \"mail\": {matcher.scores('send an email')}")
+            return False
+        if matcher.scores("notebook") != {}:
+            print("✗ Keywords should only match whole words")
+            return False
+        print("✓ Keywords match whole words only")
+
+        if matcher.scores("Tasks TASK task") != {"tasks": 1.0}:
+            print(f"✗ Plurals and repeats: {matcher.scores('Tasks TASK task')}")
+            return False
+        print("✓ Plurals and case are matched, and repeats count once")
+
+        if matcher.scores("add it to   my to\tdo list") != {"tasks": 1.0}:
+            print("✗ Multi-word keywords should match across any whitespace")
+            return False
+        print("✓ Multi-word keywords match across any whitespace")
+
+        if matcher.classify("turn that note into a task") != ("notes", False):
+            print("✗ A command scoring two intents equally should not be confident")
+            return False
+        if matcher.classify("make a task from that note") != ("tasks", False):
+            print("✗ Ties should fall to the intent mentioned first")
+            return False
+        print("✓ Ties are left to the LLM, with the first mentioned intent as fallback")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing Intent Matcher")
+    print("=" * 40)
+
+    success = test_default_keywords()
+    success = test_scoring() and success
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")
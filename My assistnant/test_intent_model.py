@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the example based intent classifier
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from intent_model import IntentModel
+
+def _load_examples():
+    with open(config.INTENT_EXAMPLES_PATH, encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    return [(example["text"], example["intent"]) for example in examples]
+
+def test_seed_examples():
+    """Check the model trained on intents.jsonl."""
+    try:
+        model = IntentModel.from_jsonl(
+            config.INTENT_EXAMPLES_PATH, config.INTENT_MODEL_THRESHOLD, config.INTENT_MODEL_MARGIN
+        )
+        examples = _load_examples()
+        wrong = [(text, intent) for text, intent in examples if model.classify(text) != intent]
+        if wrong:
+            print(f"✗ Seed examples misclassified: {wrong}")
+            return False
+        print(f"✓ All {len(examples)} seed examples classify as their own intent")
+
+        # Paraphrases and recognition errors that are not in the examples
+        cases = [
+            ("any new e-mails for me", "email"),
+            ("whats on for tomorow", "calendar"),
+            ("remind me to buy milk", "tasks"),
+            ("add buy eggs to my todos", "tasks"),
+            ("write down an idea for the blog", "notes"),
+            ("how are you today", "general"),
+            ("xyzzy plugh", None),
+            # Requests outside the handlers only loosely resemble an example; they go to the LLM
+            ("create a new playlist", None),
+            ("create a spreadsheet", None),
+            ("make a new folder", None),
+        ]
+        for text, expected in cases:
+            predicted = model.classify(text)
+            if predicted != expected:
+                print(f"✗ {text!r}: expected {expected}, got {predicted} ({model.predict(text)[1]:.2f})")
+                return False
+        print(f"✓ {len(cases)} unseen commands classified as expected")
+
+        # Each example is classified by a model trained on all the others
+        correct = 0
+        for i, (text, intent) in enumerate(examples):
+            held_out = IntentModel(threshold=0.0)
+            held_out.train(examples[:i] + examples[i + 1:])
+            correct += held_out.predict(text)[0] == intent
+        accuracy = correct / len(examples)
+        if accuracy < 0.7:
+            print(f"✗ Leave-one-out accuracy dropped to {accuracy:.0%}")
+            return False
+        print(f"✓ Leave-one-out accuracy over the examples is {accuracy:.0%}")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_edge_cases():
+    """Check untrained models and commands without known n-grams."""
+    try:
+        model = IntentModel()
+        if model.predict("check my email") != (None, 0.0) or model.classify("check my email") is not None:
+            print("✗ An untrained model should not predict anything")
+            return False
+        print("✓ An untrained model predicts nothing")
+
+        model.train([("check my email", "email"), ("book a meeting", "calendar")])
+        if model.classify("") is not None or model.classify("!!!") is not None:
+            print("✗ Commands without words should not be classified")
+            return False
+        if model.classify("check my emails") != "email":
+            print("✗ A plural of a trained word should still match")
+            return False
+        print("✓ Empty commands are ignored and plurals still match")
+
+        model = IntentModel(threshold=0.1, min_margin=0.2)
+        model.train([("create a task", "tasks"), ("create an event", "calendar")])
+        if model.classify("create") is not None:
+            print("✗ A prediction without a clear lead over another intent should not be trusted")
+            return False
+        if model.classify("create a task") != "tasks":
+            print("✗ A clear match should still be classified")
+            return False
+        print("✓ Predictions need a margin over the next intent")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing Intent Model")
+    print("=" * 40)
+
+    success = test_seed_examples()
+    success = test_edge_cases() and success
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script for spreading completions over several llama-server processes
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+import config
+from llama_pool import BackendPool
+
+URLS = ["http://a:8080/completion", "http://b:8080/completion"]
+
+def test_acquire_release():
+    """Check load balancing, latency tracking and cooldown of failed servers."""
+    try:
+        pool = BackendPool(URLS, cooldown=30)
+        a, b = pool.backends
+
+        first, second = pool.acquire(), pool.acquire()
+        if {first, second} != {a, b}:
+            print("✗ Two requests without latency samples should go to different servers")
+            return False
+        pool.release(first, 1.0)
+        pool.release(second, 0.2)
+        print("✓ Requests are spread while no latency is known")
+
+        if pool.acquire() is not b:
+            print("✗ The faster server should be picked")
+            return False
+        # b now has one request in flight: (1 + 1) * 0.2 is still below 1.0
+        if pool.acquire() is not b:
+            print("✗ A loaded fast server should still beat a slow idle one")
+            return False
+        # (2 + 1) * 0.2 = 0.6, and so on until b is expected to take longer than a
+        picks = [pool.acquire() for _ in range(4)]
+        if a not in picks:
+            print("✗ The slow server should be used once the fast one is busy enough")
+            return False
+        for backend in [b, b] + picks:
+            pool.release(backend, None)
+        if any(stat["in_flight"] for stat in pool.stats()):
+            print(f"✗ Every request was released, but in_flight is {pool.stats()}")
+            return False
+        print("✓ The server expected to answer first is picked, counting its load")
+
+        if [stat["latency"] for stat in pool.stats()] != [1.0, 0.2]:
+            print(f"✗ Releasing without a latency should not change it: {pool.stats()}")
+            return False
+        pool.release(pool.acquire(exclude=[a]), 1.2)
+        if abs(b.latency - (0.2 + 0.3 * 1.0)) > 1e-9:
+            print(f"✗ Latency should be a moving average, got {b.latency}")
+            return False
+        print("✓ Latency is a moving average and unaffected by releases without a sample")
+
+        pool.release(pool.acquire(exclude=[a]), 0.1, failed=True)
+        if b.healthy or pool.stats()[1]["failures"] != 1:
+            print("✗ A failed server should be marked down")
+            return False
+        if pool.acquire() is not a:
+            print("✗ A server in its cooldown should be avoided")
+            return False
+        pool.release(a, 1.0, failed=True)
+        if pool.acquire() is not b:
+            print("✗ With every server down, the one retried soonest should be used")
+            return False
+        if pool.acquire(exclude=[a, b]) is not None:
+            print("✗ acquire() should return None once every server was tried")
+            return False
+        print("✓ Failed servers are avoided until their cooldown ends")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def json(self):
+        return self.payload
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class FakeSession:
+    def __init__(self, outcomes):
+        """outcomes maps a URL to an exception to raise or a status code to answer with."""
+        self.outcomes = outcomes
+        self.calls = []
+
+    def post(self, url, **kwargs):
+        self.calls.append(url)
+        outcome = self.outcomes[url]
+        if isinstance(outcome, Exception):
+            raise outcome
+        content = json.dumps({"action": "general", "intent": "read", "parameters": {}, "response": "Hi."})
+        return FakeResponse(outcome, {"content": content})
+
+def test_failover():
+    """Check that LlamaClient fails over and always releases the server it used."""
+    try:
+        config.LLAMA_SERVER_URLS = URLS
+        config.INTENT_CACHE_PATH = None
+        from llama_request import LlamaClient
+
+        cases = [
+            ("a server dying mid-response", requests.exceptions.ChunkedEncodingError("Connection broken")),
+            ("a refused connection", requests.ConnectionError("refused")),
+            ("a busy server", 503),
+        ]
+        for name, outcome in cases:
+            client = LlamaClient()
+            client.pool.release(client.pool.acquire(), 0.1)  # a answers first
+            client.session = FakeSession({URLS[0]: outcome, URLS[1]: 200})
+            result = client._request_action(f"hello {name}")
+            stats = client.pool.stats()
+            if result["response"] != "Hi." or client.session.calls != URLS:
+                print(f"✗ {name}: no failover, got {result} after calling {client.session.calls}")
+                return False
+            if any(stat["in_flight"] for stat in stats):
+                print(f"✗ {name}: a server was not released: {stats}")
+                return False
+            busy = outcome == 503
+            if stats[0]["healthy"] != busy or stats[0]["failures"] != (0 if busy else 1):
+                print(f"✗ {name}: unexpected state of the first server: {stats[0]}")
+                return False
+            print(f"✓ Fails over on {name}, {'without' if busy else 'with'} a cooldown")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing llama-server Pool")
+    print("=" * 40)
+
+    success = test_acquire_release()
+    success = test_failover() and success
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")
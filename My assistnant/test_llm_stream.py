@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for parsing streamed LLM output
+"""
+
+import sys
+import os
+import json
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from llm_stream import IncrementalJSONParser, SentenceBuffer, iter_sse
+
+OUTPUT = (
+    'Sure! {"action": "calendar", "intent": "read", '
+    '"parameters": {"summary": "Standup {x}", "attendees": ["a, b", "c"], "n": [1, {"k": null}]}, '
+    '"ok": true, "count": -2.5e1, '
+    '"response": "You have two events today. The first is \\"standup\\" at 9.\\u00e9 Bye"}'
+)
+EXPECTED = json.loads(OUTPUT[OUTPUT.index('{'):])
+
+def _chunks(text, rng):
+    """Split text into random pieces, like tokens arriving from the server."""
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 6)
+        yield text[pos:pos + size]
+        pos += size
+
+def test_partial_json():
+    """Check that fields and partial strings are right however the output is split."""
+    try:
+        rng = random.Random(7)
+        for _ in range(200):
+            parser = IncrementalJSONParser()
+            seen_action_before_response = False
+            previous = ''
+            for chunk in _chunks(OUTPUT, rng):
+                parser.feed(chunk)
+                if 'action' in parser.fields and 'response' not in parser.fields:
+                    seen_action_before_response = True
+                text = parser.partial_string('response')
+                if text is not None:
+                    if not EXPECTED['response'].startswith(text) or len(text) < len(previous):
+                        print(f"✗ Partial response {text!r} is not a growing prefix")
+                        return False
+                    previous = text
+            if parser.fields != EXPECTED or not parser.done:
+                print(f"✗ Parsed {parser.fields}, expected {EXPECTED}")
+                return False
+            if not seen_action_before_response:
+                print("✗ The action should be available before the response has finished")
+                return False
+        print("✓ Fields match json.loads for randomly split output")
+        print("✓ Earlier fields are available while the response still streams")
+        print("✓ Partial response text only grows, including across split escapes")
+
+        parser = IncrementalJSONParser()
+        parser.feed('{"action": "general", "response": "Cut o')
+        if parser.done or parser.partial_string('response') != 'Cut o' or 'response' in parser.fields:
+            print("✗ A cut off object should not be done or have a complete response")
+            return False
+        print("✓ Output cut off mid-string is reported as incomplete")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_sentences():
+    """Check that sentences are handed out once complete."""
+    try:
+        buffer = SentenceBuffer()
+        spoken = []
+        for chunk in ['Hello th', 'ere. How are', ' you? I am', ' fine!  Goo', 'dbye']:
+            spoken.extend(buffer.feed(chunk))
+        if spoken != ['Hello there.', 'How are you?', 'I am fine!']:
+            print(f"✗ Sentences while streaming: {spoken}")
+            return False
+        rest = buffer.flush()
+        if rest != ['Goodbye'] or buffer.flush() != []:
+            print(f"✗ flush() returned {rest}")
+            return False
+        print("✓ Sentences are released as soon as they end, the rest on flush")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_sse():
+    """Check that server-sent events are decoded and comments skipped."""
+    try:
+        class FakeResponse:
+            def iter_lines(self, decode_unicode=False):
+                return iter([': ping', '', 'data: {"content": "a"}', '', 'data: {"content": "b", "stop": true}', 'data: [DONE]', 'data: {"content": "c"}'])
+
+        events = list(iter_sse(FakeResponse()))
+        if [event['content'] for event in events] != ['a', 'b']:
+            print(f"✗ Events: {events}")
+            return False
+        print("✓ SSE data lines are decoded until [DONE]")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing LLM Stream Parsing")
+    print("=" * 40)
+
+    success = test_partial_json()
+    success = test_sentences() and success
+    success = test_sse() and success
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for decoding Gmail message bodies
+"""
+
+import sys
+import os
+import base64
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.mime_decoder import decode_part, extract_text
+
+def _part(mime_type, text, charset='utf-8', filename=''):
+    """Build a leaf part the way the Gmail API returns it."""
+    return {
+        'mimeType': mime_type,
+        'filename': filename,
+        'headers': [{'name': 'Content-Type', 'value': f'{mime_type}; charset="{charset}"'}],
+        'body': {'data': base64.urlsafe_b64encode(text.encode(charset)).decode('ascii')}
+    }
+
+def test_nested_multipart():
+    """Check that the right part is found in nested multipart messages."""
+    try:
+        payload = {
+            'mimeType': 'multipart/mixed',
+            'parts': [
+                {
+                    'mimeType': 'multipart/alternative',
+                    'parts': [
+                        _part('text/html', '<html><head><style>p {}</style></head><body><p>Hello <b>Bob</b></p></body></html>'),
+                        {
+                            'mimeType': 'multipart/related',
+                            'parts': [_part('text/plain', 'Plain body wins')]
+                        }
+                    ]
+                },
+                _part('text/plain', 'attachment text', filename='notes.txt')
+            ]
+        }
+        text = extract_text(payload)
+        if text != 'Plain body wins':
+            print(f"✗ Expected the nested text/plain part, got {text!r}")
+            return False
+        print("✓ Nested text/plain part is preferred over HTML")
+
+        # Without a text/plain part, the HTML is stripped of markup, styles and attachments
+        payload['parts'][0]['parts'].pop()
+        text = extract_text(payload)
+        if text != 'Hello Bob':
+            print(f"✗ Expected text from the HTML part, got {text!r}")
+            return False
+        print("✓ HTML part is converted to text when there is no plain part")
+
+        if extract_text({'mimeType': 'multipart/mixed', 'parts': [_part('text/plain', 'x', filename='a.txt')]}) != '':
+            print("✗ Attachments should be skipped")
+            return False
+        print("✓ Attachments are skipped")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_charset_truncation():
+    """Check that truncated bodies never end in a broken character."""
+    try:
+        text = 'héllo wörld ' * 50
+        for max_bytes in range(1, 40):
+            decoded = decode_part(_part('text/plain', text), max_bytes)
+            if '�' in decoded or not text.startswith(decoded):
+                print(f"✗ UTF-8 cut at {max_bytes} bytes gave {decoded!r}")
+                return False
+        print("✓ UTF-8 characters cut off by the byte limit are dropped")
+
+        decoded = decode_part(_part('text/plain', 'Grüße aus Köln', charset='iso-8859-1'), 100)
+        if decoded != 'Grüße aus Köln':
+            print(f"✗ Latin-1 body decoded as {decoded!r}")
+            return False
+        part = _part('text/plain', 'plain ascii')
+        part['headers'] = [{'name': 'Content-Type', 'value': 'text/plain; charset=x-unknown'}]
+        decoded = decode_part(part, 100)
+        if decoded != 'plain ascii':
+            print(f"✗ Unknown charset decoded as {decoded!r}")
+            return False
+        print("✓ Declared charsets are honoured and unknown ones fall back to UTF-8")
+
+        text = extract_text({'mimeType': 'text/plain', **_part('text/plain', 'ü' * 5000)}, max_chars=10)
+        if text != 'ü' * 10:
+            print(f"✗ extract_text returned {text!r}")
+            return False
+        print("✓ extract_text stops at max_chars")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing Gmail MIME Decoding")
+    print("=" * 40)
+
+    success = test_nested_multipart()
+    success = test_charset_truncation() and success
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")
@@ -1,5 +1,4 @@
-from tasks.notion_notes import NotionClient
-from tasks.notion_tasks import NotionTasks
+from tasks.services import get_service
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -29,7 +28,7 @@ def test_notion():
         
         print("\n=== Testing Notion Notes ===")
         # Initialize Notion client
-        notion_notes = NotionClient()
+        notion_notes = get_service("notion_notes")
         
         # Test 1: Create a note
         print("\nTest 1: Creating a note...")
@@ -56,7 +55,7 @@ def test_notion():
         
         print("\n=== Testing Notion Tasks ===")
         # Initialize Notion tasks
-        notion_tasks = NotionTasks()
+        notion_tasks = get_service("notion_tasks")
         
         # Test 4: Create a task
         print("\nTest 4: Creating a task...")
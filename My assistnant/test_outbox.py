@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-disk email outbox and its background worker
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.outbox import Outbox, OutboxWorker
+
+class FakeHttpError(Exception):
+    """Stands in for googleapiclient's HttpError, which carries resp.status."""
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = type("Response", (), {"status": status})()
+
+def _drain(outbox, send, outbox_id, max_attempts=3):
+    """Run a worker until an email is sent or given up on, and return its row."""
+    worker = OutboxWorker(outbox, send, max_attempts=max_attempts, base_delay=0.01, max_delay=0.05)
+    worker.start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            item = outbox.get(outbox_id)
+            if item['status'] in ('sent', 'failed'):
+                return item
+            time.sleep(0.01)
+        return outbox.get(outbox_id)
+    finally:
+        worker.stop()
+
+def test_dedupe(directory):
+    """Check that identical emails are only queued once."""
+    try:
+        outbox = Outbox(os.path.join(directory, "dedupe.db"), dedupe_window=600)
+        first, duplicate = outbox.enqueue(" Bob@Example.com", "Hi", "See you at 3")
+        again, duplicate_again = outbox.enqueue("bob@example.com ", "Hi", "See you at 3")
+        if duplicate or not duplicate_again or again != first:
+            print("✗ The same email to the same address in other case or spacing should be a duplicate")
+            return False
+        if outbox.enqueue("bob@example.com", "Hi", "See you at 4")[1]:
+            print("✗ A different body is a different email")
+            return False
+        print("✓ Identical emails are queued once, whatever the address case or spacing")
+
+        outbox.mark_sent(first)
+        if outbox.enqueue("bob@example.com", "Hi", "See you at 3") != (first, True):
+            print("✗ An email sent within the dedupe window should not be queued again")
+            return False
+        failed, _ = outbox.enqueue("carol@example.com", "Hi", "Lunch?")
+        outbox.mark_failed(failed, "HTTP 400")
+        if outbox.enqueue("carol@example.com", "Hi", "Lunch?")[1]:
+            print("✗ A failed email should be queued again when asked to")
+            return False
+        outbox.close()
+
+        outbox = Outbox(os.path.join(directory, "dedupe.db"), dedupe_window=0)
+        if outbox.enqueue("bob@example.com", "Hi", "See you at 3")[1]:
+            print("✗ A sent email outside the dedupe window should be queued again")
+            return False
+        outbox.close()
+        print("✓ Sent emails are deduplicated within the window only, failed ones never")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_worker(directory):
+    """Check retries, permanent failures and giving up."""
+    try:
+        outbox = Outbox(os.path.join(directory, "worker.db"))
+
+        calls = []
+        def flaky(to, subject, body):
+            calls.append(to)
+            if len(calls) < 3:
+                raise FakeHttpError(503)
+        outbox_id, _ = outbox.enqueue("bob@example.com", "Retry", "body")
+        item = _drain(outbox, flaky, outbox_id, max_attempts=5)
+        if item['status'] != 'sent' or item['attempts'] != 3 or len(calls) != 3:
+            print(f"✗ Expected a send on the third attempt, got {item['status']} after {item['attempts']}")
+            return False
+        print("✓ Transient errors are retried until the email is sent")
+
+        calls.clear()
+        def rejected(to, subject, body):
+            calls.append(to)
+            raise FakeHttpError(400)
+        outbox_id, _ = outbox.enqueue("bob@example.com", "Permanent", "body")
+        item = _drain(outbox, rejected, outbox_id)
+        if item['status'] != 'failed' or len(calls) != 1 or 'HTTP 400' not in item['error']:
+            print(f"✗ A 400 should fail at once, got {item['status']} after {len(calls)} attempts")
+            return False
+        print("✓ Permanent 4xx errors are not retried")
+
+        calls.clear()
+        def rate_limited(to, subject, body):
+            calls.append(to)
+            raise FakeHttpError(429)
+        outbox_id, _ = outbox.enqueue("bob@example.com", "Give up", "body")
+        item = _drain(outbox, rate_limited, outbox_id, max_attempts=3)
+        if item['status'] != 'failed' or item['attempts'] != 3 or len(calls) != 3:
+            print(f"✗ Expected to give up after 3 attempts, got {item['status']} after {len(calls)}")
+            return False
+        print("✓ Retryable errors are given up on after max_attempts")
+
+        outbox.close()
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_crash_recovery(directory):
+    """Check that an email being sent when the process died is sent after a restart."""
+    try:
+        path = os.path.join(directory, "crash.db")
+        outbox = Outbox(path)
+        outbox_id, _ = outbox.enqueue("bob@example.com", "Crash", "body")
+        if outbox.claim_next()['id'] != outbox_id or outbox.get(outbox_id)['status'] != 'sending':
+            print("✗ claim_next() should mark the email as sending")
+            return False
+        if outbox.claim_next() is not None:
+            print("✗ An email being sent should not be claimed twice")
+            return False
+        outbox.close()
+
+        outbox = Outbox(path)
+        if outbox.get(outbox_id)['status'] != 'pending' or outbox.next_due() is None:
+            print("✗ Reopening should put the interrupted email back in the queue")
+            return False
+        item = outbox.claim_next()
+        if item is None or item['attempts'] != 2:
+            print(f"✗ The interrupted email should be retried as its second attempt, got {item}")
+            return False
+        outbox.close()
+        print("✓ Emails left sending by a crash are queued again on restart")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing Email Outbox")
+    print("=" * 40)
+
+    directory = tempfile.mkdtemp()
+    try:
+        success = test_dedupe(directory)
+        success = test_worker(directory) and success
+        success = test_crash_recovery(directory) and success
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared API token bucket
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.rate_limit import TokenBucket
+
+def test_refill():
+    """Check that bursts are allowed up to capacity and then held to the rate."""
+    try:
+        bucket = TokenBucket(rate=10, capacity=3)
+        waits = [bucket.acquire() for _ in range(3)]
+        if max(waits) > 0.05:
+            print(f"✗ The first burst should not wait, waited {waits}")
+            return False
+        print("✓ A burst up to capacity is sent immediately")
+
+        started = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        elapsed = time.monotonic() - started
+        if not 0.4 <= elapsed < 0.8:
+            print(f"✗ 5 requests at 10/s took {elapsed:.2f}s")
+            return False
+        print(f"✓ Requests beyond the burst are spaced at the rate ({elapsed:.2f}s for 5)")
+
+        time.sleep(1)
+        if bucket.acquire() > 0.05:
+            print("✗ The bucket should have refilled while idle")
+            return False
+        print("✓ The bucket refills while idle")
+
+        stats = bucket.stats()
+        if stats['requests'] != 9 or stats['throttled_requests'] < 4:
+            print(f"✗ Unexpected stats {stats}")
+            return False
+        print("✓ Stats count requests and throttled requests")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+def test_pause():
+    """Check that a Retry-After pause holds back callers, including ones already waiting."""
+    try:
+        bucket = TokenBucket(rate=10, capacity=3)
+        bucket.pause(0.5)
+        waited = bucket.acquire()
+        if not 0.5 <= waited < 0.8:
+            print(f"✗ Waited {waited:.2f}s after a 0.5s pause")
+            return False
+        print(f"✓ pause() holds back the next request ({waited:.2f}s)")
+
+        # Traffic resumes from an empty bucket instead of a burst
+        started = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        if time.monotonic() - started < 0.25:
+            print("✗ Requests after a pause should not burst")
+            return False
+        print("✓ Requests after a pause are not sent as a burst")
+
+        # A thread already waiting for a token sees a pause that starts meanwhile
+        bucket = TokenBucket(rate=2, capacity=1)
+        bucket.acquire()
+        result = {}
+        worker = threading.Thread(target=lambda: result.setdefault('waited', bucket.acquire()))
+        worker.start()
+        time.sleep(0.1)
+        bucket.pause(1.0)
+        worker.join(5)
+        if result.get('waited', 0) < 1.0:
+            print(f"✗ Waiting thread only waited {result.get('waited')}")
+            return False
+        print(f"✓ A waiting thread is held back by a later pause ({result['waited']:.2f}s)")
+
+        if bucket.stats()['rate_limited'] != 1:
+            print("✗ rate_limited should count the pause")
+            return False
+        print("✓ Stats count rate limit pauses")
+        return True
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Testing API Rate Limiter")
+    print("=" * 40)
+
+    success = test_refill()
+    success = test_pause() and success
+
+    if success:
+        print("\n✓ All tests completed!")
+    else:
+        print("\n✗ Tests failed!")